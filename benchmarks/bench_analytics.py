@@ -0,0 +1,67 @@
+"""
+bench_analytics.py
+Measures the mkl report analytics with NumPy against the pure Python
+fallback, on columns built once from a generated list.
+
+Run from the repository root after `pip install -e .[analytics]`:
+
+python benchmarks/bench_analytics.py --sizes 100000 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from mkl import analytics
+from mkl.columnar import ItemColumns
+
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_load import dump_records  # noqa: E402
+
+
+def run_reports(analytics_class, columns: ItemColumns) -> dict:
+    """Make every report once, the way mkl report does."""
+    report = analytics_class(columns)
+    return {
+        "total": report.total_cost(round_cost=True),
+        "stores": report.spend_by_store(),
+        "priorities": report.spend_by_priority(),
+        "percentiles": report.percentiles([50, 90, 99]),
+        "histogram": report.histogram(10),
+        "top": report.top_lines(10),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+        help="Item counts to measure",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Runs of each engine, the best is kept",
+    )
+    args = parser.parse_args()
+
+    engines = analytics.get_engines()
+    if "numpy" not in engines:
+        print("NumPy is not installed, only the Python engine is measured")
+
+    print(f"{'items':>10} {'engine':>7} {'reports s':>10}")
+    for size in args.sizes:
+        columns = ItemColumns.from_records(json.loads(dump_records(size)))
+
+        for engine in engines:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                run_reports(analytics.ANALYTICS_CLASSES[engine], columns)
+                best = min(best, time.perf_counter() - start)
+
+            print(f"{size:>10} {engine:>7} {best:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
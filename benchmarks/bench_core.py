@@ -0,0 +1,271 @@
+"""
+bench_core.py
+Times the core GroceryList operations on generated lists of each size.
+
+Operations are:
+-load: read the whole list from storage into items
+-save: write the whole list, GroceryList.save_data()
+-search_item_name: one prefix search, the name index is built beforehand
+-add_item, edit_item, remove_item: one change to the list in memory
+-sort_items: sort the whole list by cost
+-calculate_total_cost: total of the whole list
+-export_items: stream the items to buy to a text file
+
+Load, save, sort, total and export are timed as one call, the best of
+--repeat runs. Search, add, edit and remove are timed as the mean of --ops
+calls. Writes are held while the changes are timed, see
+GroceryList.hold_writes(), so they time the list and its indexes, and
+save times the write.
+
+Results are printed as a table and saved as JSON. With --compare, they are
+checked against an earlier results file. Any operation slower than the
+baseline by more than --tolerance is reported, and the exit status is 1,
+so the suite can gate a change. Nothing from Qt is imported.
+
+Run from the repository root after `pip install -e .`:
+
+python benchmarks/bench_core.py --output baseline.json
+python benchmarks/bench_core.py --compare baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import mkl.constants as constants
+
+sys.path.insert(0, os.path.dirname(__file__))
+from generate import write_list  # noqa: E402
+
+OPERATIONS = [
+    "load",
+    "save",
+    "search_item_name",
+    "add_item",
+    "edit_item",
+    "remove_item",
+    "sort_items",
+    "calculate_total_cost",
+    "export_items",
+]
+
+
+def best_time(function, repeat: int, before=None) -> float:
+    best = float("inf")
+
+    for _ in range(repeat):
+        if before:
+            before()
+
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def mean_time(function, arguments: list) -> float:
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - start) / len(arguments)
+
+
+def run_size(size: int, storage_format: str, ops: int, repeat: int, directory: str) -> dict[str, float]:
+    """
+    Time every operation on a generated list.
+
+    Returns:
+        dict[str, float]: Seconds per call, by operation.
+    """
+    grocery_list = write_list(size, storage_format)
+    rng = random.Random(size)
+    results = {}
+
+    results["load"] = best_time(
+        lambda: grocery_list.grocery_list, repeat, before=grocery_list.unload
+    )
+    results["save"] = best_time(grocery_list.save_data, repeat)
+
+    grocery_list.hold_writes()
+
+    grocery_list.get_index("name")
+    prefixes = [f"item {rng.randrange(size)}" for _ in range(ops)]
+    results["search_item_name"] = mean_time(grocery_list.search_item_name, prefixes)
+
+    results["add_item"] = mean_time(
+        lambda number: grocery_list.add_item(f"bench {number}", "Costco", 1.99, 1, 1, True),
+        range(ops),
+    )
+
+    ids = [item.id for item in rng.sample(grocery_list.grocery_list, min(ops, size))]
+    results["edit_item"] = mean_time(
+        lambda id: grocery_list.edit_item("edited", cost=2.5, id=id), ids
+    )
+
+    # remove_item() prints what it removed, keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["remove_item"] = mean_time(
+            lambda id: grocery_list.remove_item("edited", id), ids
+        )
+
+    results["sort_items"] = best_time(
+        lambda: grocery_list.sort_items("cost"),
+        repeat,
+        # Sorting sorted items is quicker, start from a shuffle each time
+        before=lambda: rng.shuffle(grocery_list.grocery_list),
+    )
+
+    results["calculate_total_cost"] = best_time(
+        lambda: grocery_list.calculate_total_cost(grocery_list.grocery_list), repeat
+    )
+
+    path = os.path.join(directory, "export.txt")
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["export_items"] = best_time(
+            lambda: grocery_list.export_items(path, "text", quiet=True), repeat
+        )
+
+    return results
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def print_results(results: dict) -> None:
+    sizes = list(results)
+
+    print(f"{'operation':<22}" + "".join(f"{size:>12}" for size in sizes))
+    for operation in OPERATIONS:
+        print(
+            f"{operation:<22}"
+            + "".join(f"{format_seconds(results[size][operation]):>12}" for size in sizes)
+        )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Print the change of every operation against a baseline.
+
+    Args:
+        results (dict): Seconds by size, then operation.
+        baseline (dict): The same, from an earlier run.
+        tolerance (float): Slowdown allowed, 0.25 is 25 percent.
+
+    Returns:
+        list[str]: The operations slower than allowed, as "operation at size".
+    """
+    regressions = []
+
+    print(f"\n{'operation':<22} {'items':>10} {'baseline':>10} {'now':>10} {'change':>8}")
+    for size, timings in results.items():
+        for operation, seconds in timings.items():
+            before = baseline.get(size, {}).get(operation)
+            if before is None:
+                continue
+
+            change = seconds / before - 1
+            flag = ""
+            if change > tolerance:
+                flag = "  slower"
+                regressions.append(f"{operation} at {size}")
+
+            print(
+                f"{operation:<22} {size:>10} {format_seconds(before):>10} "
+                f"{format_seconds(seconds):>10} {change:>+8.0%}{flag}"
+            )
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000],
+        help="Item counts to measure",
+    )
+    parser.add_argument(
+        "--storage", choices=constants.STORAGE_FORMATS, default="json",
+        help="Storage format of the lists",
+    )
+    parser.add_argument(
+        "--ops", type=int, default=100,
+        help="Calls of each operation timed as a mean",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Runs of each operation timed as the best",
+    )
+    parser.add_argument(
+        "--output", default="bench_core.json",
+        help="JSON file to save the results to",
+    )
+    parser.add_argument(
+        "--compare", metavar="BASELINE",
+        help="Results file of an earlier run to check against",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="Slowdown allowed by --compare, 0.25 is 25 percent",
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        if os.path.abspath(args.compare) == os.path.abspath(args.output):
+            parser.error("--compare must not be the --output file, it would be overwritten")
+
+        # Read before measuring, a missing baseline fails at once
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        constants.EXPORT_PATH = directory
+
+        for size in args.sizes:
+            results[str(size)] = run_size(
+                size, args.storage, args.ops, args.repeat, directory
+            )
+
+    print_results(results)
+
+    with open(args.output, "w") as file:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "storage": args.storage,
+                "ops": args.ops,
+                "repeat": args.repeat,
+                "results": results,
+            },
+            file,
+            indent=4,
+        )
+    print(f"\nSaved to {args.output}")
+
+    if baseline is not None:
+        if baseline.get("storage") != args.storage:
+            print(f"The baseline used {baseline.get('storage')} storage, not {args.storage}")
+
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\nSlower than the baseline: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo operation is slower than the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+bench_export.py
+Measures `mkl export` in each format: the time to stream the items to buy
+of a loaded list to a file, the write speed, and the memory the export
+allocates on top of the list. Then times `export --split-by store` with
+each number of worker processes.
+
+Run from the repository root after `pip install -e .`:
+
+python benchmarks/bench_export.py --sizes 100000 1000000 --workers 1 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import mkl.constants as constants
+from mkl import exporter, mk_core
+
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_load import dump_records  # noqa: E402
+
+
+def export(grocery_list, path: str, export_format: str) -> None:
+    # The total is printed, keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        grocery_list.export_items(path, export_format, quiet=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+        help="Item counts to measure",
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, os.cpu_count()],
+        help="Worker process counts to time the split export with",
+    )
+    parser.add_argument(
+        "--stores", type=int, default=50, help="Stores to split the items into"
+    )
+    args = parser.parse_args()
+
+    split_times = []
+
+    print(f"{'items':>10} {'format':>7} {'export s':>9} {'MB/s':>7} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        constants.EXPORT_PATH = directory
+
+        for size in args.sizes:
+            grocery_list = mk_core.GroceryList("json")
+            records = json.loads(dump_records(size))
+            for number, record in enumerate(records):
+                record["_store"] = f"store {number % args.stores}"
+            grocery_list.storage.save(records)
+            grocery_list.set_grocery_list()
+            grocery_list.grocery_list
+
+            for export_format in exporter.EXPORT_FORMATS:
+                path = os.path.join(directory, f"export.{export_format}")
+
+                start = time.perf_counter()
+                export(grocery_list, path, export_format)
+                elapsed = time.perf_counter() - start
+                size_mb = os.path.getsize(path) / 2**20
+                os.remove(path)
+
+                # Measured apart, tracing slows the export down
+                tracemalloc.start()
+                export(grocery_list, path, export_format)
+                peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+                os.remove(path)
+
+                print(
+                    f"{size:>10} {export_format:>7} {elapsed:>9.3f} "
+                    f"{size_mb / elapsed:>7.0f} {peak_mb:>8.1f}"
+                )
+
+            for workers in args.workers:
+                start = time.perf_counter()
+                exporter.export_split(
+                    grocery_list.iter_items(buy=True),
+                    os.path.join(directory, f"split {size} {workers}"),
+                    "text",
+                    workers=workers,
+                )
+                split_times.append((size, workers, time.perf_counter() - start))
+
+    print(f"\n{'items':>10} {'workers':>8} {'split s':>8}  ({args.stores} stores)")
+    for size, workers, elapsed in split_times:
+        print(f"{size:>10} {workers:>8} {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+bench_load.py
+Measures how long it takes to turn a loaded JSON file into GroceryItems.
+
+Loaders are:
+-setattr: GroceryItem() with defaults, then hasattr and setattr for every
+ key, how GroceryList.load_data worked before the trusted path
+-setters: GroceryItem.from_record, every value through its setter, the path
+ used for records that fail the column check
+-trusted: items_from_records on a valid file, one check per column and
+ then items built directly
+
+Decoding the JSON costs the same for every loader and is timed on its own.
+
+Run from the repository root after `pip install -e .`:
+
+python benchmarks/bench_load.py --sizes 100000 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from mkl.grocery_item import GroceryItem, items_from_records
+
+sys.path.insert(0, os.path.dirname(__file__))
+from generate import make_records  # noqa: E402
+
+
+def dump_records(size: int) -> str:
+    """Get a saved grocery list of the given size as JSON text."""
+    return json.dumps(make_records(size))
+
+
+def load_setattr(records):
+    items = []
+    for record in records:
+        item = GroceryItem()
+        for key, value in record.items():
+            if hasattr(item, key):
+                setattr(item, key, value)
+        items.append(item)
+    return items
+
+
+def load_setters(records):
+    return [GroceryItem.from_record(record) for record in records]
+
+
+def load_trusted(records):
+    return items_from_records(records)
+
+
+LOADERS = {
+    "setattr": load_setattr,
+    "setters": load_setters,
+    "trusted": load_trusted,
+}
+
+
+def best_time(function, *args, repeat: int) -> float:
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+        help="Item counts to measure",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Runs of each loader, the best is kept",
+    )
+    args = parser.parse_args()
+
+    print(f"{'items':>10} {'loader':>8} {'seconds':>9} {'speedup':>8}")
+    for size in args.sizes:
+        text = dump_records(size)
+        decode = best_time(json.loads, text, repeat=args.repeat)
+        print(f"{size:>10} {'json':>8} {decode:>9.3f} {'':>8}")
+
+        records = json.loads(text)
+        baseline = None
+
+        for loader, load in LOADERS.items():
+            seconds = best_time(load, records, repeat=args.repeat)
+            baseline = baseline or seconds
+            print(
+                f"{size:>10} {loader:>8} {seconds:>9.3f} "
+                f"{baseline / seconds:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+bench_locking.py
+Measures writes from several processes to the same grocery list at once.
+
+Each writer process adds items one at a time, every add is one locked
+write that merges what the others wrote. Reports the writes per second,
+checks that no write was lost and times GroceryList.refresh() when nothing
+changed, the check a long running process makes before each read.
+
+Run from the repository root after `pip install -e .`:
+
+python benchmarks/bench_locking.py --storage journal --writers 4 --adds 200
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+
+import mkl.constants as constants
+from mkl import mk_core
+
+
+def write(directory: str, storage_format: str, writer: int, adds: int) -> None:
+    constants.EXPORT_PATH = directory
+    grocery_list = mk_core.GroceryList(storage_format)
+
+    for number in range(adds):
+        grocery_list.add_item(f"writer {writer} item {number}", "Aldi", 1.5, 1, 1, True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument(
+        "--storage", default="json", choices=constants.STORAGE_FORMATS,
+        help="Storage format to write",
+    )
+    parser.add_argument("--writers", type=int, default=4, help="Writer processes")
+    parser.add_argument("--adds", type=int, default=200, help="Adds by each writer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        constants.EXPORT_PATH = directory
+        # Create the empty list before the writers race to
+        mk_core.GroceryList(args.storage)
+
+        processes = [
+            multiprocessing.Process(
+                target=write, args=(directory, args.storage, writer, args.adds)
+            )
+            for writer in range(args.writers)
+        ]
+
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        grocery_list = mk_core.GroceryList(args.storage)
+        count = len(grocery_list.grocery_list)
+        expected = args.writers * args.adds
+
+        rounds = 10_000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            grocery_list.refresh()
+        refresh_us = (time.perf_counter() - start) / rounds * 1e6
+
+    print(
+        f"{args.storage}: {expected} adds by {args.writers} writers in "
+        f"{elapsed:.2f} s, {expected / elapsed:.0f} writes/s"
+    )
+    print(f"Items saved: {count} of {expected}, {expected - count} lost")
+    print(f"Refresh with nothing changed: {refresh_us:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+bench_memory.py
+Measures the memory used per grocery item by each item layout.
+
+Layouts are:
+-dict: a plain class with a per-instance __dict__, how GroceryItem was
+ stored before it had __slots__
+-slots: GroceryItem with __slots__
+-columns: ItemColumns, typed columns with interned stores
+
+Run from the repository root after `pip install -e .`:
+
+python benchmarks/bench_memory.py --sizes 100000 1000000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+from mkl.columnar import ItemColumns
+from mkl.grocery_item import GroceryItem
+
+sys.path.insert(0, os.path.dirname(__file__))
+from generate import make_records  # noqa: E402
+
+
+class DictItem:
+    """The attributes of a GroceryItem, kept in a per-instance __dict__."""
+
+    def __init__(self, record):
+        self._name = record["_name"]
+        self._store = record["_store"]
+        self._cost = record["_cost"]
+        self._amount = record["_amount"]
+        self._priority = record["_priority"]
+        self._buy = record["_buy"]
+        self._id = record["_id"]
+
+
+def build_dict(records):
+    return [DictItem(record) for record in records]
+
+
+def build_slots(records):
+    items = []
+    for record in records:
+        item = GroceryItem()
+        for key, value in record.items():
+            setattr(item, key, value)
+        items.append(item)
+    return items
+
+
+def build_columns(records):
+    return ItemColumns.from_records(records)
+
+
+LAYOUTS = {
+    "dict": build_dict,
+    "slots": build_slots,
+    "columns": build_columns,
+}
+
+
+def measure(build, size: int) -> int:
+    """
+    Get the bytes still allocated after building a layout.
+
+    The records are generated while tracing and dropped before measuring,
+    so the names, costs and ids each layout keeps are counted and the
+    records themselves are not.
+    """
+    gc.collect()
+
+    tracemalloc.start()
+    records = make_records(size)
+    built = build(records)
+    del records
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del built
+    return allocated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+        help="Item counts to measure",
+    )
+    args = parser.parse_args()
+
+    print(f"{'items':>10} {'layout':>8} {'MB':>9} {'bytes/item':>11}")
+    for size in args.sizes:
+        for layout, build in LAYOUTS.items():
+            allocated = measure(build, size)
+            print(
+                f"{size:>10} {layout:>8} {allocated / 2**20:>9.1f} "
+                f"{allocated / size:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
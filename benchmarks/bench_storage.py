@@ -0,0 +1,98 @@
+"""
+bench_storage.py
+Measures how long the json and binary storage formats take to save and
+load a whole grocery list, and how big the file is.
+
+Save is the time from the items to a new file, as GroceryList.save_data
+does it. Load is the time from the file to the items, as GroceryList.load_data
+does it.
+
+Run from the repository root after `pip install -e .`:
+
+python benchmarks/bench_storage.py --sizes 100000 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from mkl import storage
+from mkl.grocery_item import columns_from_items, items_from_records, items_from_rows
+
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_load import dump_records  # noqa: E402
+
+FORMATS = ["json", "binary"]
+
+
+def save(store, items) -> None:
+    if store.trusted:
+        store.save_columns(columns_from_items(items))
+    else:
+        store.save([item.to_dict() for item in items])
+
+
+def load(store) -> list:
+    if store.trusted:
+        return items_from_rows(store.load_rows())
+    return items_from_records(store.load())
+
+
+def best_time(function, *args, repeat: int, before=None) -> float:
+    best = float("inf")
+
+    for _ in range(repeat):
+        if before:
+            before()
+
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+        # Freeing the items is not part of the step
+        del result
+
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+        help="Item counts to measure",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Runs of each step, the best is kept",
+    )
+    args = parser.parse_args()
+
+    print(f"{'items':>10} {'format':>7} {'save s':>8} {'load s':>8} {'MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            items = items_from_records(json.loads(dump_records(size)))
+
+            for storage_format in FORMATS:
+                store = storage.get_storage(
+                    storage_format, os.path.join(directory, storage_format)
+                )
+                # Each save writes a new file, so freeing the old one on a
+                # slow file system is not timed
+                save_time = best_time(
+                    save, store, items, repeat=args.repeat,
+                    before=lambda: os.path.exists(store.path)
+                    and os.remove(store.path),
+                )
+                load_time = best_time(load, store, repeat=args.repeat)
+                size_mb = os.path.getsize(store.path) / 2**20
+
+                print(
+                    f"{size:>10} {storage_format:>7} {save_time:>8.3f} "
+                    f"{load_time:>8.3f} {size_mb:>8.1f}"
+                )
+                os.remove(store.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+generate.py
+Makes synthetic grocery lists of any size for the benchmarks.
+
+The same size and seed always give the same items, so runs on different
+machines or commits measure the same list. Names are "item <number>",
+stores, costs, amounts, priorities and buy flags are random, ids are
+random UUIDs.
+
+Run from the repository root after `pip install -e .` to write a list in
+any storage format, in place of the one in constants.EXPORT_PATH:
+
+python benchmarks/generate.py --items 100000 --storage sqlite
+"""
+import argparse
+import os
+import random
+import uuid
+
+import mkl.constants as constants
+from mkl import mk_core, storage
+from mkl.locking import StorageLock
+
+STORES = ["Costco", "Wal-Mart", "Aldi", "Target", "Trader Joes", "Kroger"]
+
+
+def make_records(size: int, seed: int | None = None, stores: list[str] = STORES) -> list[dict]:
+    """
+    Make the saved records of a grocery list.
+
+    Args:
+        size (int): The number of items.
+        seed (int | None): Seed of the random values, the size if None.
+        stores (list[str]): The stores to pick from.
+
+    Returns:
+        list[dict]: The item records, as GroceryItem.to_dict() makes them.
+    """
+    rng = random.Random(size if seed is None else seed)
+
+    return [
+        {
+            "_name": f"item {number}",
+            "_store": rng.choice(stores),
+            "_cost": round(rng.uniform(0.5, 50), 2),
+            "_amount": rng.randint(1, 12),
+            "_priority": rng.randint(1, 5),
+            "_buy": rng.random() < 0.5,
+            "_id": int(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        }
+        for number in range(size)
+    ]
+
+
+def write_list(size: int, storage_format: str, seed: int | None = None) -> mk_core.GroceryList:
+    """
+    Replace the list in constants.EXPORT_PATH with a generated one.
+
+    Args:
+        size (int): The number of items.
+        storage_format (str): One of constants.STORAGE_FORMATS.
+        seed (int | None): Seed of the random values, the size if None.
+
+    Returns:
+        GroceryList: The list, not loaded yet.
+    """
+    os.makedirs(constants.EXPORT_PATH, exist_ok=True)
+    store = storage.get_storage(
+        storage_format, os.path.join(constants.EXPORT_PATH, constants.GROCERY_LIST)
+    )
+    storage_lock = StorageLock(store.path)
+
+    with storage_lock.hold(exclusive=True):
+        store.save(make_records(size, seed))
+        storage_lock.bump()
+
+    return mk_core.GroceryList(storage_format)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--items", type=int, required=True, help="Item count")
+    parser.add_argument(
+        "--storage", choices=constants.STORAGE_FORMATS, default=constants.STORAGE_FORMAT,
+        help="Storage format to write",
+    )
+    parser.add_argument("--seed", type=int, help="Seed of the random values")
+    args = parser.parse_args()
+
+    grocery_list = write_list(args.items, args.storage, args.seed)
+    print(f"Wrote {args.items} items to {grocery_list.storage.path}")
+
+
+if __name__ == "__main__":
+    main()
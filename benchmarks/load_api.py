@@ -0,0 +1,143 @@
+"""
+load_api.py
+Local load generator for the HTTP/JSON API of `mkl api`.
+
+Opens a number of keep-alive connections and sends requests on all of them
+at once, a mix of searches, item reads and adds. Reports the requests per
+second and the p50 and p99 latency of each kind of request.
+
+Start the server first, then run from the repository root:
+
+mkl --storage journal api --port 8080
+python benchmarks/load_api.py --port 8080 --connections 50 --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+
+async def send(reader, writer, method: str, path: str, body=None) -> tuple:
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: localhost\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "\r\n"
+        ).encode()
+        + data
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+
+    return status, json.loads(await reader.readexactly(length))
+
+
+def pick_request(rng: random.Random, write_ratio: float, ids: list) -> tuple:
+    if rng.random() < write_ratio:
+        number = rng.randrange(1_000_000)
+        return "add", "POST", "/items", {
+            "name": f"load item {number}",
+            "store": rng.choice(["Costco", "Aldi", "Kroger"]),
+            "cost": round(rng.uniform(0.5, 20), 2),
+            "amount": rng.randint(1, 5),
+            "priority": rng.randint(1, 5),
+            "buy": True,
+        }
+
+    if ids and rng.random() < 0.5:
+        return "get", "GET", f"/items/{rng.choice(ids)}", None
+
+    return "search", "GET", f"/search?q=load+item+{rng.randrange(10)}&limit=10", None
+
+
+async def run_connection(args, rng, queue, latencies, ids, errors) -> None:
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+
+    try:
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            kind, method, path, body = pick_request(rng, args.write_ratio, ids)
+            start = time.perf_counter()
+            status, answer = await send(reader, writer, method, path, body)
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+
+            if status >= 400:
+                errors.append(status)
+            elif kind == "add":
+                ids.append(answer["id"])
+    finally:
+        writer.close()
+
+
+def percentile(values: list, percent: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+async def main_async(args) -> None:
+    queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(None)
+
+    latencies = {}
+    ids = []
+    errors = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_connection(args, random.Random(number), queue, latencies, ids, errors)
+        for number in range(args.connections)
+    ))
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{args.requests} requests on {args.connections} connections in "
+        f"{elapsed:.2f} s, {args.requests / elapsed:.0f} requests/s, "
+        f"{len(errors)} errors"
+    )
+    print(f"{'request':>8} {'count':>7} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for kind, values in sorted(latencies.items()):
+        print(
+            f"{kind:>8} {len(values):>7} {percentile(values, 50) * 1000:>8.2f} "
+            f"{percentile(values, 99) * 1000:>8.2f} "
+            f"{statistics.mean(values) * 1000:>8.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--host", default="127.0.0.1", help="Server address")
+    parser.add_argument("--port", type=int, default=8080, help="Server port")
+    parser.add_argument(
+        "--connections", type=int, default=50, help="Connections open at once"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=20_000, help="Requests to send in total"
+    )
+    parser.add_argument(
+        "--write-ratio", dest="write_ratio", type=float, default=0.1,
+        help="Share of the requests that add an item",
+    )
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,5 +13,9 @@ setup(
         ],
     },
     install_requires=[],
+    extras_require={
+        # Vectorized reports for mkl report, see mkl.analytics
+        "analytics": ["numpy"],
+    },
     python_requires=">=3.7",
 )
\ No newline at end of file
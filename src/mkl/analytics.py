@@ -0,0 +1,265 @@
+"""
+analytics.py
+Reports over large grocery lists: spend by store and by priority, line
+cost percentiles and histograms, and the most expensive lines.
+
+The list is copied once into typed columns, see mkl.columnar. With NumPy
+installed (`pip install -e .[analytics]`) the columns are viewed as NumPy
+arrays without copying and every report is one vectorized operation.
+Without it the same reports run as plain Python loops over the columns.
+
+A line is one item, its cost is amount times cost. Reports only count the
+items to buy, unless made with buy_only=False.
+"""
+import heapq
+import math
+
+import mkl.constants as constants
+from mkl.columnar import ItemColumns
+from mkl.mk_core import GroceryList
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class PythonAnalytics:
+    """
+    Reports computed with Python loops over the columns.
+
+    Args:
+        columns (ItemColumns): The items.
+        buy_only (bool): Only report the items to buy.
+    """
+
+    engine = "python"
+
+    def __init__(self, columns: ItemColumns, buy_only: bool = True):
+        self.columns = columns
+        self.rows = [
+            row for row, buy in enumerate(columns.buys) if buy or not buy_only
+        ]
+        costs = columns.costs
+        amounts = columns.amounts
+        self.line_costs = [amounts[row] * costs[row] for row in self.rows]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def total_cost(self, round_cost: bool = False, tax: float = constants.TAX_RATE) -> float:
+        """Like GroceryList.calculate_total_cost() over the reported items."""
+        return GroceryList.apply_tax(sum(self.line_costs), round_cost, tax)
+
+    def group_totals(self, codes) -> dict:
+        totals = {}
+
+        for row, line_cost in zip(self.rows, self.line_costs):
+            group = totals.setdefault(codes[row], [0, 0.0])
+            group[0] += 1
+            group[1] += line_cost
+
+        return {code: tuple(group) for code, group in totals.items()}
+
+    def spend_by_store(self) -> dict[str, tuple[int, float]]:
+        """
+        Get the line count and spend of each store.
+
+        Returns:
+            dict[str, tuple[int, float]]: The count and spend, by store.
+        """
+        stores = self.columns.stores
+        return {
+            stores[code]: totals
+            for code, totals in sorted(self.group_totals(self.columns.store_codes).items())
+        }
+
+    def spend_by_priority(self) -> dict[int, tuple[int, float]]:
+        """
+        Get the line count and spend of each priority.
+
+        Returns:
+            dict[int, tuple[int, float]]: The count and spend, by priority.
+        """
+        return dict(sorted(self.group_totals(self.columns.priorities).items()))
+
+    def percentiles(self, percents) -> list[float]:
+        """
+        Get percentiles of the line costs, interpolated between the two
+        nearest lines like numpy.percentile().
+
+        Args:
+            percents (iterable[float]): Percentiles from 0 to 100.
+
+        Returns:
+            list[float]: The line cost at each percentile, empty if there
+                are no lines.
+        """
+        values = sorted(self.line_costs)
+        if not values:
+            return []
+
+        results = []
+        for percent in percents:
+            position = (len(values) - 1) * percent / 100
+            low = math.floor(position)
+            high = min(low + 1, len(values) - 1)
+            results.append(values[low] + (values[high] - values[low]) * (position - low))
+
+        return results
+
+    def histogram(self, bins: int) -> list[tuple[float, float, int]]:
+        """
+        Count the lines in equal width line cost ranges, like
+        numpy.histogram().
+
+        Args:
+            bins (int): The number of ranges.
+
+        Returns:
+            list[tuple[float, float, int]]: The start, end and line count
+                of each range, the last range includes its end.
+        """
+        if not self.line_costs:
+            return []
+
+        low = min(self.line_costs)
+        high = max(self.line_costs)
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+
+        width = (high - low) / bins
+        counts = [0] * bins
+        for line_cost in self.line_costs:
+            counts[min(int((line_cost - low) / width), bins - 1)] += 1
+
+        return [
+            (low + width * number, low + width * (number + 1), count)
+            for number, count in enumerate(counts)
+        ]
+
+    def top_lines(self, limit: int) -> list[tuple[str, str, float]]:
+        """
+        Get the most expensive lines.
+
+        Args:
+            limit (int): The most lines to return.
+
+        Returns:
+            list[tuple[str, str, float]]: The name, store and line cost of
+                each line, most expensive first.
+        """
+        best = heapq.nlargest(
+            limit, range(len(self.rows)), key=self.line_costs.__getitem__
+        )
+        return [self.describe_line(self.rows[number], self.line_costs[number]) for number in best]
+
+    def describe_line(self, row: int, line_cost: float) -> tuple[str, str, float]:
+        columns = self.columns
+        return columns.names[row], columns.stores[columns.store_codes[row]], line_cost
+
+
+class NumpyAnalytics(PythonAnalytics):
+    """Reports computed with vectorized NumPy operations over the columns."""
+
+    engine = "numpy"
+
+    def __init__(self, columns: ItemColumns, buy_only: bool = True):
+        self.columns = columns
+
+        # Views of the column buffers, nothing is copied
+        costs = np.frombuffer(columns.costs, dtype=np.float64)
+        amounts = np.frombuffer(columns.amounts, dtype=np.int64)
+        buys = np.frombuffer(columns.buys, dtype=np.uint8).astype(bool)
+
+        self.rows = np.flatnonzero(buys) if buy_only else np.arange(len(columns))
+        self.line_costs = amounts[self.rows] * costs[self.rows]
+        self.store_codes = np.frombuffer(
+            columns.store_codes, dtype=np.dtype(columns.store_codes.typecode)
+        )[self.rows]
+        self.priorities = np.frombuffer(columns.priorities, dtype=np.uint8)[self.rows]
+
+    def total_cost(self, round_cost: bool = False, tax: float = constants.TAX_RATE) -> float:
+        return GroceryList.apply_tax(float(self.line_costs.sum()), round_cost, tax)
+
+    def group_totals(self, codes) -> dict:
+        counts = np.bincount(codes)
+        spend = np.bincount(codes, weights=self.line_costs)
+
+        return {
+            int(code): (int(counts[code]), float(spend[code]))
+            for code in np.flatnonzero(counts)
+        }
+
+    def spend_by_store(self) -> dict[str, tuple[int, float]]:
+        stores = self.columns.stores
+        return {
+            stores[code]: totals
+            for code, totals in self.group_totals(self.store_codes).items()
+        }
+
+    def spend_by_priority(self) -> dict[int, tuple[int, float]]:
+        return self.group_totals(self.priorities)
+
+    def percentiles(self, percents) -> list[float]:
+        if not len(self.line_costs):
+            return []
+        return [float(value) for value in np.percentile(self.line_costs, list(percents))]
+
+    def histogram(self, bins: int) -> list[tuple[float, float, int]]:
+        if not len(self.line_costs):
+            return []
+
+        counts, edges = np.histogram(self.line_costs, bins=bins)
+        return [
+            (float(edges[number]), float(edges[number + 1]), int(count))
+            for number, count in enumerate(counts)
+        ]
+
+    def top_lines(self, limit: int) -> list[tuple[str, str, float]]:
+        limit = min(limit, len(self.line_costs))
+        if limit <= 0:
+            return []
+
+        # Only the top lines are sorted
+        best = np.argpartition(-self.line_costs, limit - 1)[:limit]
+        best = best[np.argsort(-self.line_costs[best], kind="stable")]
+
+        return [
+            self.describe_line(int(self.rows[number]), float(self.line_costs[number]))
+            for number in best
+        ]
+
+
+ANALYTICS_CLASSES = {
+    "python": PythonAnalytics,
+    "numpy": NumpyAnalytics,
+}
+
+
+def get_engines() -> list[str]:
+    """Get the engines that can run here, NumPy only when installed."""
+    return [engine for engine in ANALYTICS_CLASSES if engine != "numpy" or np]
+
+
+def get_analytics(grocery_list: GroceryList, engine: str | None = None, buy_only: bool = True):
+    """
+    Copy a grocery list into columns and get the reports over them.
+
+    Args:
+        grocery_list (GroceryList): The list to report on.
+        engine (str | None): "numpy" or "python", NumPy when installed if
+            None.
+        buy_only (bool): Only report the items to buy.
+
+    Raises:
+        ValueError: If the engine is unknown or NumPy is not installed.
+
+    Returns:
+        PythonAnalytics: The reports.
+    """
+    engine = engine or get_engines()[-1]
+    if engine not in get_engines():
+        raise ValueError(f"Analytics engine {engine} is not available, pick from {get_engines()}")
+
+    return ANALYTICS_CLASSES[engine](grocery_list.get_columns(), buy_only=buy_only)
@@ -0,0 +1,388 @@
+"""
+api_server.py
+HTTP/JSON API over a GroceryList, built on asyncio and the standard
+library only.
+
+Endpoints are:
+-GET /items?buy=true&offset=0&limit=100: items in list order.
+-GET /items/<id>: one item.
+-GET /search?q=milk&fuzzy=false&limit=20: items by name prefix, or fuzzy.
+-GET /export: the items to buy and their total cost.
+-POST /items: add an item, the body holds its fields.
+-PATCH /items/<id>: edit the fields in the body.
+-DELETE /items/<id>: remove an item.
+
+Reads are answered from the list in memory on the event loop. Writes are
+checked, then queued for one writer task. The writer applies every queued
+write in memory and saves them all with one write on a worker thread, so a
+burst of writes costs one save and the event loop never waits on disk. A
+write is answered once it is saved. If saving fails, the writes are undone
+in memory and answered with the error.
+
+Other processes may write to the same storage. Requests refresh the list
+first, which costs a stat unless storage changed, see GroceryList.refresh().
+"""
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import mkl.constants as constants
+from mkl.importer import build_item, parse_buy
+
+ITEM_FIELDS = ["name", "store", "cost", "amount", "priority", "buy"]
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def item_to_json(item) -> dict:
+    return {
+        "id": item.id,
+        "name": item.name,
+        "store": item.store,
+        "cost": item.cost,
+        "amount": item.amount,
+        "priority": item.priority,
+        "buy": item.buy,
+    }
+
+
+def get_fields(body: bytes, required: bool) -> dict:
+    """
+    Check the item fields of a request body with the GroceryItem setters.
+
+    Args:
+        body (bytes): The JSON request body.
+        required (bool): At least one field must be given.
+
+    Raises:
+        HttpError: If the body is not a JSON object of valid fields.
+
+    Returns:
+        dict: The given fields, converted to their types.
+    """
+    try:
+        fields = json.loads(body or b"{}")
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be JSON") from None
+
+    if not isinstance(fields, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+
+    unknown = set(fields) - set(ITEM_FIELDS)
+    if unknown:
+        raise HttpError(
+            HTTPStatus.BAD_REQUEST, f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+
+    if required and not fields:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "No fields to change")
+
+    # build_item() takes these for a missing value and uses the default
+    empty = [field for field, value in fields.items() if value in (None, "")]
+    if empty:
+        raise HttpError(
+            HTTPStatus.BAD_REQUEST, f"Fields can not be null or empty: {', '.join(empty)}"
+        )
+
+    try:
+        item = build_item(fields)
+    except (ValueError, TypeError) as error:
+        raise HttpError(HTTPStatus.BAD_REQUEST, str(error)) from None
+
+    return {field: getattr(item, field) for field in fields}
+
+
+def get_int(query: dict, name: str, default: int) -> int:
+    try:
+        return int(query.get(name, [default])[0])
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be an int") from None
+
+
+def get_bool(query: dict, name: str, default: bool | None) -> bool | None:
+    if name not in query:
+        return default
+
+    try:
+        return parse_buy(query[name][0])
+    except ValueError as error:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name}: {error}") from None
+
+
+def get_id(text: str) -> int:
+    try:
+        return int(text)
+    except ValueError:
+        raise HttpError(HTTPStatus.NOT_FOUND, f"No item with id {text}") from None
+
+
+class ApiServer:
+    """
+    Serves the API for one GroceryList.
+
+    Args:
+        grocery_list (GroceryList): The list, its writes are held in memory
+            and saved by the writer task.
+    """
+
+    def __init__(self, grocery_list):
+        self.grocery_list = grocery_list
+        self.grocery_list.hold_writes()
+        self.writes: asyncio.Queue | None = None
+        # The writer is saving on a worker thread, the list must not be
+        # replaced until it is done
+        self.saving = False
+
+    # Writing=================================
+
+    async def write(self, apply):
+        """
+        Queue a write and wait until it is saved.
+
+        Args:
+            apply (callable): Changes the list in memory, returns the answer.
+
+        Returns:
+            The answer of apply.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.writes.put((apply, future))
+        return await future
+
+    async def run_writer(self) -> None:
+        """Apply and save queued writes, everything queued in one save."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            writes = [await self.writes.get()]
+            while not self.writes.empty():
+                writes.append(self.writes.get_nowait())
+
+            self.grocery_list.refresh()
+            results = []
+            try:
+                # Saved inside the batch, so a failed save also undoes the
+                # writes in memory and a retried write is not saved twice
+                with self.grocery_list.batch():
+                    for apply, future in writes:
+                        try:
+                            results.append((future, apply(), None))
+                        except Exception as error:
+                            results.append((future, None, error))
+
+                    self.saving = True
+                    # Nothing changes the list while it is saved, the next
+                    # writes wait in the queue
+                    await loop.run_in_executor(None, self.grocery_list.save_batch)
+            except Exception as error:
+                logging.exception("Saving the grocery list failed")
+                results = [(future, None, error) for future, _, _ in results]
+            finally:
+                self.saving = False
+
+            for future, result, error in results:
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    # Routes==================================
+
+    async def dispatch(self, method: str, target: str, body: bytes):
+        """
+        Answer one request.
+
+        Returns:
+            tuple[HTTPStatus, object]: The status and the JSON answer.
+        """
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        query = parse_qs(url.query)
+        grocery_list = self.grocery_list
+
+        if not self.saving:
+            grocery_list.refresh()
+
+        if parts == ["items"] and method == "GET":
+            buy = get_bool(query, "buy", None)
+            offset = max(get_int(query, "offset", 0), 0)
+            limit = max(get_int(query, "limit", constants.API_PAGE_SIZE), 0)
+
+            items = grocery_list.grocery_list
+            if buy is not None:
+                items = [item for item in items if item.buy == buy]
+            return HTTPStatus.OK, {
+                "total": len(items),
+                "items": [item_to_json(item) for item in items[offset:offset + limit]],
+            }
+
+        if parts == ["items"] and method == "POST":
+            fields = get_fields(body, required=False)
+            item = build_item(fields)
+            await self.write(lambda: grocery_list.append_item(item))
+            return HTTPStatus.CREATED, item_to_json(item)
+
+        if len(parts) == 2 and parts[0] == "items":
+            id = get_id(parts[1])
+
+            if method == "GET":
+                return HTTPStatus.OK, item_to_json(self.get_item(id))
+
+            if method == "PATCH":
+                fields = get_fields(body, required=True)
+                self.get_item(id)
+
+                def edit():
+                    grocery_list.edit_items({id: fields})
+                    return grocery_list.get_item(id)
+
+                return HTTPStatus.OK, item_to_json(await self.write(edit))
+
+            if method == "DELETE":
+                self.get_item(id)
+                item = await self.write(lambda: grocery_list.pop_item(id))
+                return HTTPStatus.OK, item_to_json(item)
+
+        if parts == ["search"] and method == "GET":
+            search = query.get("q", [""])[0]
+            limit = max(get_int(query, "limit", constants.FUZZY_LIMIT), 0)
+
+            if get_bool(query, "fuzzy", False):
+                matches = grocery_list.search_item_fuzzy(search, limit=limit)
+            else:
+                matches = grocery_list.search_item_name(search)[:limit]
+
+            return HTTPStatus.OK, {"items": [item_to_json(item) for item in matches]}
+
+        if parts == ["export"] and method == "GET":
+            buy_list = list(grocery_list.iter_items(buy=True))
+            return HTTPStatus.OK, {
+                "items": [item_to_json(item) for item in buy_list],
+                "total_cost": grocery_list.get_total_cost(round_cost=True),
+            }
+
+        if parts and parts[0] in ("items", "search", "export"):
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed")
+
+        raise HttpError(HTTPStatus.NOT_FOUND, f"No route for {url.path}")
+
+    def get_item(self, id: int):
+        try:
+            return self.grocery_list.get_item(id)
+        except KeyError:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"No item with id {id}") from None
+
+    # Connections=============================
+
+    async def handle_connection(self, reader, writer) -> None:
+        """Answer requests on one connection until it is closed."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+
+                method, target, version = request_line.decode("latin-1").split()
+                headers = await self.read_headers(reader)
+
+                length = int(headers.get("content-length", 0))
+                if length > constants.API_MAX_BODY:
+                    raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body is too large")
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, answer = await self.dispatch(method, target, body)
+                except HttpError as error:
+                    status, answer = error.status, {"error": str(error)}
+                except (KeyError, ValueError) as error:
+                    # A write found the item gone or a value bad when applied
+                    status, answer = HTTPStatus.CONFLICT, {"error": str(error)}
+                except Exception as error:
+                    logging.exception(f"{method} {target} failed")
+                    status = HTTPStatus.INTERNAL_SERVER_ERROR
+                    answer = {"error": f"{type(error).__name__}: {error}"}
+
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                writer.write(self.format_response(status, answer, keep_alive))
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+
+        except HttpError as error:
+            writer.write(self.format_response(error.status, {"error": str(error)}, False))
+        except (ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.write(
+                self.format_response(HTTPStatus.BAD_REQUEST, {"error": "Bad request"}, False)
+            )
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def read_headers(reader) -> dict:
+        headers = {}
+
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    def format_response(status: HTTPStatus, answer, keep_alive: bool) -> bytes:
+        body = json.dumps(answer).encode()
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        return head.encode("latin-1") + body
+
+    async def serve(self, host: str, port: int) -> None:
+        self.writes = asyncio.Queue()
+        writer_task = asyncio.create_task(self.run_writer())
+
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving the grocery list API at http://{host}:{port}, Ctrl+C to stop")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+
+
+def run(grocery_list, host: str, port: int) -> None:
+    """
+    Serve the API until interrupted, then save any held changes.
+
+    Args:
+        grocery_list (GroceryList): The list to serve.
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+    """
+    api_server = ApiServer(grocery_list)
+
+    try:
+        asyncio.run(api_server.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        grocery_list.flush()
@@ -0,0 +1,250 @@
+"""
+binary_storage.py
+Binary snapshot storage backend for GroceryList.
+
+The whole list is written as one file of typed column blocks, so loading
+and saving are a handful of bulk conversions instead of a JSON value per
+field. The file is:
+
+-header: magic, format version, item count, store count, payload size and
+ the CRC32 of the payload.
+-names: all of them as one UTF-8 block separated by NUL characters. If a
+ name holds a NUL itself, the character length of each name is saved too.
+-string table: the unique store names, stored the same way.
+-columns: store positions in the string table, costs, amounts, priorities,
+ buy flags and 16 byte ids, one block each.
+
+A file with another version or a checksum that does not match is refused,
+so a loaded snapshot is trusted and its items are built without validation.
+"""
+import itertools
+import os
+import struct
+import sys
+import zlib
+from array import array
+from operator import itemgetter
+
+from mkl.grocery_item import RECORD_KEYS
+
+MAGIC = b"MKLB"
+VERSION = 1
+# Magic, version, item count, store count, payload size and CRC32
+HEADER = struct.Struct("<4sHQQQI")
+# Block of raw bytes, prefixed with its size
+BLOCK_SIZE = struct.Struct("<Q")
+
+
+def to_little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_little_endian(typecode: str, data) -> list:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+class BinaryStorage:
+    """Stores the grocery list as a versioned, checksummed binary snapshot."""
+
+    extension = "bin"
+    queryable = False
+    snapshot = True
+    trusted = True
+
+    def __init__(self, base_path: str):
+        self.path = f"{base_path}.{self.extension}"
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def reset(self) -> None:
+        """Nothing is cached, every load reads the file."""
+
+    # Reading=================================
+
+    def load(self) -> list[dict]:
+        return [dict(zip(RECORD_KEYS, row)) for row in self.load_rows()]
+
+    def load_rows(self):
+        """
+        Read the snapshot as rows of values.
+
+        Raises:
+            ValueError: If the file has another version or is corrupt.
+
+        Returns:
+            iterable[tuple]: The values of each item in RECORD_KEYS order.
+        """
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return []
+
+        if len(data) < HEADER.size:
+            raise ValueError(f"{self.path} is not a grocery list snapshot")
+
+        magic, version, count, store_count, size, checksum = (
+            HEADER.unpack_from(data)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a grocery list snapshot")
+
+        if version != VERSION:
+            raise ValueError(
+                f"{self.path} has snapshot version {version}, "
+                f"only version {VERSION} is supported"
+            )
+
+        payload = memoryview(data)[HEADER.size:]
+        if len(payload) != size or zlib.crc32(payload) != checksum:
+            raise ValueError(f"{self.path} is corrupt, its checksum does not match")
+
+        blocks = self.split_blocks(payload)
+
+        names = self.read_strings(next(blocks), next(blocks), count)
+        stores = self.read_strings(next(blocks), next(blocks), store_count)
+        store_codes = from_little_endian("Q", next(blocks))
+        costs = from_little_endian("d", next(blocks))
+        amounts = from_little_endian("q", next(blocks))
+        priorities = list(next(blocks))
+        buys = list(map(bool, next(blocks)))
+        ids = list(map(
+            int.from_bytes,
+            map(itemgetter(0), struct.iter_unpack("16s", next(blocks))),
+            itertools.repeat("big"),
+        ))
+
+        columns = (names, store_codes, costs, amounts, priorities, buys, ids)
+        if len(stores) != store_count or any(
+            len(column) != count for column in columns[1:]
+        ):
+            raise ValueError(f"{self.path} is corrupt, it is missing items")
+
+        stores = map(stores.__getitem__, store_codes)
+        return zip(names, stores, costs, amounts, priorities, buys, ids)
+
+    @staticmethod
+    def read_strings(lengths: memoryview, text: memoryview, count: int) -> list[str]:
+        if not count:
+            return []
+
+        text = str(text, "utf-8")
+        if not lengths:
+            strings = text.split("\0")
+        else:
+            ends = list(itertools.accumulate(from_little_endian("Q", lengths)))
+            strings = list(
+                map(text.__getitem__, map(slice, [0] + ends[:-1], ends))
+            )
+
+        if len(strings) != count:
+            raise ValueError("Binary snapshot is corrupt, a string table is short")
+        return strings
+
+    @staticmethod
+    def split_blocks(payload: memoryview):
+        offset = 0
+        while offset < len(payload):
+            (size,) = BLOCK_SIZE.unpack_from(payload, offset)
+            offset += BLOCK_SIZE.size
+            yield payload[offset:offset + size]
+            offset += size
+
+    # Writing=================================
+
+    def save(self, records: list[dict]) -> None:
+        """
+        Write a full snapshot of the grocery list.
+
+        Args:
+            records (list[dict]): Every item record in list order.
+
+        Raises:
+            ValueError: If an amount or id does not fit its column.
+        """
+        records = list(records)
+        self.write_columns(
+            [list(map(itemgetter(key), records)) for key in RECORD_KEYS]
+        )
+
+    def save_columns(self, columns: list[list]) -> None:
+        """
+        Write a full snapshot from the item values a column at a time.
+
+        Args:
+            columns (list[list]): One list of values per key, in RECORD_KEYS
+                order, see grocery_item.columns_from_items().
+
+        Raises:
+            ValueError: If an amount or id does not fit its column.
+        """
+        self.write_columns(columns)
+
+    def write_columns(self, columns: list[list]) -> None:
+        names, stores, costs, amounts, priorities, buys, ids = columns
+
+        # Stores repeat, so each is saved once and items keep its position
+        store_codes = {store: None for store in stores}
+        store_codes.update(zip(store_codes, itertools.count()))
+
+        try:
+            blocks = [
+                *self.dump_strings(names),
+                *self.dump_strings(store_codes),
+                to_little_endian(array("Q", map(store_codes.__getitem__, stores))),
+                to_little_endian(array("d", costs)),
+                to_little_endian(array("q", amounts)),
+                bytes(priorities),
+                bytes(map(int, buys)),
+                b"".join(
+                    map(int.to_bytes, ids, itertools.repeat(16),
+                        itertools.repeat("big"))
+                ),
+            ]
+        except (OverflowError, ValueError) as error:
+            raise ValueError(f"Item does not fit the binary format: {error}") from None
+
+        payload = b"".join(
+            BLOCK_SIZE.pack(len(block)) + block for block in blocks
+        )
+        header = HEADER.pack(
+            MAGIC, VERSION, len(names), len(store_codes), len(payload),
+            zlib.crc32(payload),
+        )
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(header)
+            file.write(payload)
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def dump_strings(strings) -> tuple[bytes, bytes]:
+        strings = list(strings)
+        text = "\0".join(strings)
+
+        # Lengths are only needed when a NUL is part of a string
+        lengths = b""
+        if text.count("\0") > max(len(strings) - 1, 0):
+            lengths = to_little_endian(array("Q", map(len, strings)))
+            text = "".join(strings)
+
+        return lengths, text.encode("utf-8")
+
+    def write_changes(self, changes: list[dict], get_records) -> None:
+        """
+        Persist a group of changes that were already applied in memory.
+
+        Args:
+            changes (list[dict]): The change records, oldest first.
+            get_records (callable): Returns every item record in list order.
+        """
+        self.save(get_records())
@@ -0,0 +1,205 @@
+"""
+columnar.py
+A compact, column-oriented container for large grocery lists.
+
+Each attribute is kept in its own column instead of in one object per item:
+
+-names: a list of str
+-stores: a code per item into a table of interned store names
+-costs: array('d'), amounts: array('q')
+-priorities and buy flags: one byte each in a bytearray
+-ids: the 128-bit UUID split into two array('Q') halves
+
+Indexing the container gives an ItemRow, a GroceryItem that reads and
+writes its row in the columns, so the GroceryItem setters still validate
+every change.
+"""
+import sys
+from array import array
+
+from mkl.grocery_item import GroceryItem
+
+LOW_BITS = 2**64 - 1
+
+
+class ItemColumns:
+    """Grocery items stored as typed columns, 46 bytes per item plus its name."""
+
+    def __init__(self):
+        self.names: list[str] = []
+        self.store_codes = array("I")
+        self.stores: list[str] = []
+        self.store_lookup: dict[str, int] = {}
+        self.costs = array("d")
+        self.amounts = array("q")
+        self.priorities = bytearray()
+        self.buys = bytearray()
+        self.ids_high = array("Q")
+        self.ids_low = array("Q")
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build the columns from saved item records.
+
+        Args:
+            records (iterable[dict]): The records, see GroceryItem.to_dict().
+
+        Returns:
+            ItemColumns: The columns.
+        """
+        columns = cls()
+        for record in records:
+            columns.append_record(record)
+        return columns
+
+    @classmethod
+    def from_items(cls, items):
+        columns = cls()
+        for item in items:
+            columns.append(item)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, row: int) -> "ItemRow":
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("ItemColumns index out of range")
+        return ItemRow(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield ItemRow(self, row)
+
+    def get_store_code(self, store: str) -> int:
+        code = self.store_lookup.get(store)
+
+        if code is None:
+            code = len(self.stores)
+            self.stores.append(store)
+            self.store_lookup[store] = code
+
+        return code
+
+    def append(self, item: GroceryItem) -> None:
+        self.append_record(item.to_dict())
+
+    def append_record(self, record: dict) -> None:
+        item_id = record["_id"]
+        if not 0 <= item_id < 2**128:
+            raise ValueError(f"ID must be a valid UUID, {item_id}")
+
+        self.names.append(record["_name"])
+        self.store_codes.append(self.get_store_code(record["_store"]))
+        self.costs.append(record["_cost"])
+        self.amounts.append(record["_amount"])
+        self.priorities.append(record["_priority"])
+        self.buys.append(record["_buy"])
+        self.ids_high.append(item_id >> 64)
+        self.ids_low.append(item_id & LOW_BITS)
+
+    def delete(self, row: int) -> None:
+        """Remove a row, the rows after it move up by one."""
+        for column in (
+            self.names, self.store_codes, self.costs, self.amounts,
+            self.priorities, self.buys, self.ids_high, self.ids_low,
+        ):
+            del column[row]
+
+    def to_records(self):
+        for item in self:
+            yield item.to_dict()
+
+    def get_nbytes(self) -> int:
+        """
+        Estimate the memory used by the columns, including the name and
+        store strings.
+
+        Returns:
+            int: The size in bytes.
+        """
+        size = sys.getsizeof(self.names) + sum(map(sys.getsizeof, self.names))
+        size += sys.getsizeof(self.stores) + sum(map(sys.getsizeof, self.stores))
+
+        for column in (
+            self.store_codes, self.costs, self.amounts, self.priorities,
+            self.buys, self.ids_high, self.ids_low,
+        ):
+            size += sys.getsizeof(column)
+
+        return size
+
+
+class ItemRow(GroceryItem):
+    """A GroceryItem that is a view of one row of an ItemColumns."""
+
+    __slots__ = ("columns", "row")
+
+    def __init__(self, columns: ItemColumns, row: int):
+        self.columns = columns
+        self.row = row
+
+    # The GroceryItem getters and setters go through these=================
+
+    @property
+    def _name(self):
+        return self.columns.names[self.row]
+
+    @_name.setter
+    def _name(self, value):
+        self.columns.names[self.row] = value
+
+    @property
+    def _store(self):
+        return self.columns.stores[self.columns.store_codes[self.row]]
+
+    @_store.setter
+    def _store(self, value):
+        self.columns.store_codes[self.row] = self.columns.get_store_code(value)
+
+    @property
+    def _cost(self):
+        return self.columns.costs[self.row]
+
+    @_cost.setter
+    def _cost(self, value):
+        self.columns.costs[self.row] = value
+
+    @property
+    def _amount(self):
+        return self.columns.amounts[self.row]
+
+    @_amount.setter
+    def _amount(self, value):
+        self.columns.amounts[self.row] = value
+
+    @property
+    def _priority(self):
+        return self.columns.priorities[self.row]
+
+    @_priority.setter
+    def _priority(self, value):
+        self.columns.priorities[self.row] = value
+
+    @property
+    def _buy(self):
+        return bool(self.columns.buys[self.row])
+
+    @_buy.setter
+    def _buy(self, value):
+        self.columns.buys[self.row] = value
+
+    @property
+    def _id(self):
+        high = self.columns.ids_high[self.row]
+        return (high << 64) | self.columns.ids_low[self.row]
+
+    @_id.setter
+    def _id(self, value):
+        if not 0 <= value < 2**128:
+            raise ValueError(f"ID must be a valid UUID, {value}")
+        self.columns.ids_high[self.row] = value >> 64
+        self.columns.ids_low[self.row] = value & LOW_BITS
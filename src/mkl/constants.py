@@ -1,6 +1,8 @@
 EXPORT_PATH = "C:/mk_grocery"
 EXPORT_PATH = "mydev/grocery_list"
 GROCERY_LIST = "grocery_list"
+STORAGE_FORMAT = "json"
+STORAGE_FORMATS = ["json", "journal", "sqlite", "lazy", "binary"]
 EXPORT_LIST = "exported_grocery_list.txt"
 
 NAME_DEFAULT = "unamed item"
@@ -14,5 +16,55 @@ BUY_DEFAULT = True
 BUY_TRUE = ["yes", "true"]
 BUY_FALSE = ["no", "false"]
 ID_DEFAULT = 0
+TAX_RATE = 0.08
 
+# Journal storage, compacted into a new snapshot past any of these
+JOURNAL_EXTENSION = "journal"
+JOURNAL_MAX_BYTES = 64 * 1024 * 1024
+JOURNAL_MIN_RECORDS = 100
+JOURNAL_MAX_RATIO = 0.5
 
+# Lazy storage, the data file is rewritten once this much of it is stale
+LAZY_INDEX_EXTENSION = "idx"
+LAZY_MIN_LINES = 100
+LAZY_MAX_DEAD_RATIO = 0.5
+
+# Rows saved with each write by the import command
+IMPORT_CHUNK_SIZE = 5000
+
+# Rows formatted and written at once by the export command, and its file
+# buffer
+EXPORT_CHUNK_SIZE = 10000
+EXPORT_BUFFER_SIZE = 1024 * 1024
+# Folder and index file of export --split-by
+EXPORT_SPLIT_FOLDER = "exported_by_store"
+EXPORT_INDEX = "index.json"
+
+# Socket of mkl serve, next to the data file
+DAEMON_EXTENSION = "sock"
+
+# Lock file shared by every process using the same data file
+LOCK_EXTENSION = "lock"
+
+# HTTP API of mkl api
+API_HOST = "127.0.0.1"
+API_PORT = 8080
+API_PAGE_SIZE = 100
+API_MAX_BODY = 1024 * 1024
+
+# Import time allowed for a CLI command to start, see mkl --startup-profile
+STARTUP_BUDGET_MS = 50
+
+# Fuzzy search, similarity is from 0 (nothing shared) to 1 (same text)
+FUZZY_MIN_SCORE = 0.3
+FUZZY_LIMIT = 20
+
+# UI search, runs once typing pauses this long
+SEARCH_DELAY_MS = 150
+# UI saving, changes made within this long are saved with one write
+SAVE_DELAY_MS = 500
+
+# Operation timing, see mkl.perf
+PERF_ENV = "MKL_PERF"
+PERF_EXTENSION = "perf.json"
+PERF_SAMPLES = 1000
@@ -0,0 +1,220 @@
+"""
+daemon.py
+Resident server for `mkl serve` and the client used by the CLI.
+
+The server keeps one GroceryList in memory and runs CLI commands sent over
+a Unix domain socket, so a command costs a round trip instead of starting
+Python and loading the list. Commands run one at a time under a lock. The
+list is refreshed before each command when another process, like the UI,
+wrote to storage, see GroceryList.refresh().
+
+The protocol is one JSON object per line, any number per connection:
+
+-request: {"argv": ["--mode", "cli", "list"]}
+-response: {"status": 0, "stdout": "...", "stderr": "..."}
+
+The socket sits next to the data file and is named after the storage
+format, so a client only finds a server for the format it asked for.
+"""
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+import mkl.constants as constants
+
+# Commands the server runs, the others prompt on the terminal and run in
+# the client, which shares the list with the server through the storage lock
+SERVED_COMMANDS = ["add", "list", "sort", "export", "totals", "report", "search", "import"]
+
+
+def get_socket_path(storage_format: str) -> str:
+    return os.path.join(
+        constants.EXPORT_PATH,
+        f"{constants.GROCERY_LIST}.{storage_format}.{constants.DAEMON_EXTENSION}",
+    )
+
+
+# Client==================================
+
+
+def send_command(socket_path: str, argv: list[str]) -> dict | None:
+    """
+    Run a command on the server, if one is listening.
+
+    Args:
+        socket_path (str): The server socket.
+        argv (list[str]): The mkl arguments.
+
+    Returns:
+        dict | None: The response, or None if no server is running.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            client.sendall(json.dumps({"argv": argv}).encode() + b"\n")
+
+            with client.makefile("rb") as reader:
+                line = reader.readline()
+
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+
+    if not line:
+        raise ConnectionError(f"The server at {socket_path} closed the connection")
+
+    return json.loads(line)
+
+
+def can_serve(args) -> bool:
+    """Check if the server can run a parsed command, without any prompts."""
+    if args.command == "import":
+        # The server can not read the client's stdin
+        return args.file != "-"
+    if args.command == "export":
+        # Streamed to the client's stdout without holding it in memory
+        return args.output != "-"
+    return args.command in SERVED_COMMANDS
+
+
+def forward_command(args, argv: list[str]) -> int | None:
+    """
+    Run a CLI command through the server when one is running.
+
+    Args:
+        args (argparse.Namespace): The parsed command.
+        argv (list[str]): The mkl arguments, with file paths absolute.
+
+    Returns:
+        int | None: The exit status, or None if the command should run
+            in this process.
+    """
+    socket_path = get_socket_path(args.storage)
+    if not os.path.exists(socket_path):
+        return None
+
+    if not can_serve(args):
+        return None
+
+    response = send_command(socket_path, argv)
+    if response is None:
+        return None
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["status"]
+
+
+def is_running(socket_path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+        return True
+    except (FileNotFoundError, ConnectionRefusedError):
+        return False
+
+
+# Server==================================
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    """Reads request lines from one client and answers each of them."""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                argv = [str(arg) for arg in request["argv"]]
+            except (ValueError, KeyError, TypeError):
+                response = {"status": 2, "stdout": "", "stderr": "Bad request\n"}
+            else:
+                response = self.server.run(argv)
+
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class CommandServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Accepts clients on their own threads and runs their commands one at a
+    time.
+
+    Args:
+        socket_path (str): Where to listen.
+        run_argv (callable): Runs the mkl arguments and returns the exit
+            status, see Launch.run_argv().
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, run_argv):
+        self.run_argv = run_argv
+        # The single writer, commands also share sys.stdout and sys.stderr
+        self.lock = threading.Lock()
+        super().__init__(socket_path, CommandHandler)
+
+    def run(self, argv: list[str]) -> dict:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+
+        with self.lock:
+            stdin = sys.stdin
+            # A prompt fails instead of waiting on the server's terminal
+            sys.stdin = io.StringIO()
+
+            try:
+                with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                    try:
+                        status = self.run_argv(argv)
+                    except SystemExit as exit:
+                        status = exit.code if isinstance(exit.code, int) else 1
+                    except Exception as error:
+                        print(f"{type(error).__name__}: {error}", file=sys.stderr)
+                        status = 1
+            finally:
+                sys.stdin = stdin
+
+        return {
+            "status": status or 0,
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+        }
+
+
+def serve(socket_path: str, run_argv) -> None:
+    """
+    Serve commands until interrupted or terminated.
+
+    Args:
+        socket_path (str): Where to listen.
+        run_argv (callable): Runs the mkl arguments and returns the exit
+            status.
+
+    Raises:
+        RuntimeError: If a server is already listening on the socket.
+    """
+    if os.path.exists(socket_path):
+        if is_running(socket_path):
+            raise RuntimeError(f"mkl serve is already running at {socket_path}")
+        # Left behind by a server that did not shut down
+        os.remove(socket_path)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+
+    with CommandServer(socket_path, run_argv) as server:
+        print(f"Serving the grocery list at {socket_path}, Ctrl+C to stop")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
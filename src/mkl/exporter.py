@@ -0,0 +1,312 @@
+"""
+exporter.py
+Streams grocery items out as text, CSV or JSONL.
+
+Items are read one chunk at a time, each chunk is formatted into one string
+and written with one call, so an export of any size holds one chunk in
+memory and runs close to disk speed.
+
+CSV and JSONL use the columns name, store, cost, amount, priority and buy,
+the same ones mkl.importer reads. Text is the original export layout.
+
+A split export writes one file per store, each rendered in its own worker
+process, see export_split().
+"""
+import collections
+import csv
+import io
+import itertools
+import json
+import os
+import re
+
+import mkl.constants as constants
+
+EXPORT_FORMATS = ["text", "csv", "jsonl"]
+EXPORT_FIELDS = ["name", "store", "cost", "amount", "priority", "buy"]
+EXPORT_EXTENSIONS = {"text": "txt", "csv": "csv", "jsonl": "jsonl"}
+SPLIT_FIELDS = ["store"]
+
+# The item values of a split export worker, read the same way as a
+# GroceryItem
+ExportRow = collections.namedtuple("ExportRow", EXPORT_FIELDS)
+
+
+def get_export_format(path: str) -> str:
+    """
+    Guess the export format from a file extension.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        str: One of EXPORT_FORMATS.
+    """
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension == "csv":
+        return "csv"
+    return "text"
+
+
+# Formatting==============================
+
+
+def format_text(items: list, start: int) -> str:
+    return "".join(
+        f"item {item_num} "
+        f"|name: {item.name} "
+        f"|store: {item.store} "
+        f"|cost: {item.cost} "
+        f"|amount: {item.amount} "
+        f"|priority: {item.priority} "
+        f"|buy: {item.buy} \n"
+        for item_num, item in enumerate(items, start)
+    )
+
+
+def format_csv(items: list, start: int) -> str:
+    chunk = io.StringIO()
+    csv.writer(chunk, lineterminator="\n").writerows(
+        (item.name, item.store, item.cost, item.amount, item.priority, item.buy)
+        for item in items
+    )
+    return chunk.getvalue()
+
+
+def format_jsonl(items: list, start: int) -> str:
+    return "".join(
+        json.dumps(
+            {
+                "name": item.name,
+                "store": item.store,
+                "cost": item.cost,
+                "amount": item.amount,
+                "priority": item.priority,
+                "buy": item.buy,
+            }
+        )
+        + "\n"
+        for item in items
+    )
+
+
+def format_list(items: list, start: int) -> str:
+    """Format items the way GroceryList.list_items() prints them."""
+    return "".join(
+        f"item {item_num}. "
+        f"| name: {item.name} "
+        f"| store: {item.store} "
+        f"| cost: {item.cost} "
+        f"| amount: {item.amount} "
+        f"| priority: {item.priority} "
+        f"| buy: {item.buy} \n"
+        for item_num, item in enumerate(items, start)
+    )
+
+
+FORMATTERS = {
+    "text": format_text,
+    "csv": format_csv,
+    "jsonl": format_jsonl,
+}
+
+HEADERS = {
+    "text": "",
+    "csv": ",".join(EXPORT_FIELDS) + "\n",
+    "jsonl": "",
+}
+
+
+# Writing=================================
+
+
+def iter_chunks(items):
+    """
+    Split items into chunks of constants.EXPORT_CHUNK_SIZE.
+
+    Yields:
+        tuple[int, list]: The number of the first item, from 1, and the
+            chunk.
+    """
+    items = iter(items)
+    start = 1
+
+    while True:
+        chunk = list(itertools.islice(items, constants.EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+
+        yield start, chunk
+        start += len(chunk)
+
+
+def write_items(file, items, export_format: str, echo=None) -> tuple[int, float]:
+    """
+    Stream items to an open file in chunks.
+
+    Args:
+        file (TextIO): The file to write.
+        items (iterable[GroceryItem]): The items, read once.
+        export_format (str): One of EXPORT_FORMATS.
+        echo (TextIO | None): Also print each item here, as list_items()
+            does.
+
+    Returns:
+        tuple[int, float]: The number of items written and the sum of
+            their amount times cost, summed in the same order as
+            GroceryList.calculate_total_cost().
+    """
+    formatter = FORMATTERS[export_format]
+    count = 0
+    total_cost = 0
+
+    file.write(HEADERS[export_format])
+
+    for start, chunk in iter_chunks(items):
+        for item in chunk:
+            total_cost += item.amount * item.cost
+
+        file.write(formatter(chunk, start))
+        if echo is not None:
+            echo.write(format_list(chunk, start))
+
+        count += len(chunk)
+
+    return count, total_cost
+
+
+def write_total(file, export_format: str, total_cost: float) -> None:
+    """End a text export with its total cost, the other formats have none."""
+    if export_format == "text":
+        file.write("\n")
+        file.write(f"The total cost is ${total_cost}")
+
+
+# Split exports===========================
+
+
+def get_split_file_name(key, export_format: str, used: set) -> str:
+    """
+    Get a file name for one part of a split export, safe on any file
+    system and not used by another part.
+    """
+    stem = re.sub(r"[^\w-]+", "_", str(key)).strip("_") or "none"
+    name = f"{stem}.{EXPORT_EXTENSIONS[export_format]}"
+
+    number = 1
+    while name.lower() in used:
+        number += 1
+        name = f"{stem}_{number}.{EXPORT_EXTENSIONS[export_format]}"
+
+    used.add(name.lower())
+    return name
+
+
+def render_part(path: str, rows: list, export_format: str) -> tuple[int, float, float]:
+    """
+    Write one part of a split export, runs in a worker process.
+
+    Args:
+        path (str): The file to write.
+        rows (list[tuple]): The values of each item in EXPORT_FIELDS order,
+            plain tuples are the quickest to send to the worker.
+        export_format (str): One of EXPORT_FORMATS.
+
+    Returns:
+        tuple[int, float, float]: The item count, and the cost before and
+            after tax rounded to cents, see GroceryList.calculate_total_cost().
+    """
+    # Imported here, mk_core imports this module
+    from mkl.mk_core import GroceryList
+
+    rows = list(map(ExportRow._make, rows))
+    # Rounded, so the totals of the parts add up to the total of the index
+    total_cost = round(GroceryList.calculate_total_cost(rows, round_cost=True), 2)
+
+    with open(path, "w", buffering=constants.EXPORT_BUFFER_SIZE, newline="") as file:
+        _, subtotal = write_items(file, rows, export_format)
+        write_total(file, export_format, total_cost)
+
+    return len(rows), round(subtotal, 2), total_cost
+
+
+def export_split(
+    items,
+    directory: str,
+    export_format: str,
+    split_by: str = "store",
+    workers: int | None = None,
+) -> dict:
+    """
+    Export items as one file per store, plus an index of the files.
+
+    The items are grouped in this process, then every group's file is
+    rendered in a pool of worker processes, so rendering a large list
+    scales with the cores.
+
+    Args:
+        items (iterable[GroceryItem]): The items to export.
+        directory (str): Where to write the files, created if missing.
+        export_format (str): One of EXPORT_FORMATS.
+        split_by (str): One of SPLIT_FIELDS.
+        workers (int | None): Worker processes, one per core if None.
+
+    Returns:
+        dict: The index, also written to constants.EXPORT_INDEX in the
+            directory.
+    """
+    # Only split exports start processes, keep them out of start up
+    import concurrent.futures
+    import multiprocessing
+
+    if split_by not in SPLIT_FIELDS:
+        raise ValueError(f"Can not split exports by {split_by}")
+
+    groups = {}
+    for item in items:
+        groups.setdefault(getattr(item, split_by), []).append(
+            (item.name, item.store, item.cost, item.amount, item.priority, item.buy)
+        )
+
+    os.makedirs(directory, exist_ok=True)
+    used = {constants.EXPORT_INDEX.lower()}
+    names = {key: get_split_file_name(key, export_format, used) for key in groups}
+
+    # Spawned, forking the threads of mkl serve or the UI is not safe
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = {
+            key: pool.submit(
+                render_part, os.path.join(directory, names[key]), rows, export_format
+            )
+            for key, rows in groups.items()
+        }
+
+        parts = []
+        for key, future in futures.items():
+            count, subtotal, total_cost = future.result()
+            parts.append(
+                {
+                    split_by: key,
+                    "file": names[key],
+                    "items": count,
+                    "subtotal": subtotal,
+                    "total_cost": total_cost,
+                }
+            )
+
+    index = {
+        "split_by": split_by,
+        "format": export_format,
+        "parts": parts,
+        "items": sum(part["items"] for part in parts),
+        "total_cost": round(sum(part["total_cost"] for part in parts), 2),
+    }
+    with open(os.path.join(directory, constants.EXPORT_INDEX), "w") as file:
+        json.dump(index, file, indent=4)
+
+    return index
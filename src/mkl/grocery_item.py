@@ -1,7 +1,23 @@
+import gc
+from operator import attrgetter, itemgetter
+
 import mkl.constants as constants
 
+# Keys of a saved record, in to_dict() order
+RECORD_KEYS = ("_name", "_store", "_cost", "_amount", "_priority", "_buy", "_id")
+
+# Exact value types a trusted record may hold, in RECORD_KEYS order. They
+# are compared with type() so a bool is not taken for an int, and the cost
+# setter always saves a float
+COLUMN_TYPES = ({str}, {str}, {float}, {int}, {int}, {bool}, {int})
+
 
 class GroceryItem:
+    # No per-item __dict__, see mkl.columnar for an even smaller layout
+    __slots__ = (
+        "_name", "_store", "_cost", "_amount", "_priority", "_buy", "_id"
+    )
+
     def __init__(self):
         self._name = constants.NAME_DEFAULT
         self._store = constants.STORE_DEFAULT
@@ -70,16 +86,11 @@ class GroceryItem:
         p_min = constants.PRIORITY_MIN
         p_max = constants.PRIORITY_MAX
 
-        if not value:
-            pass
-
         if not isinstance(value, int):
             raise ValueError(f"Priority must be an int, {value}")
 
-        if p_min <= value <= p_max:
-            pass
-        else:
-            raise ValueError("Priority must be between {p_min} and {p_max} ")
+        if not p_min <= value <= p_max:
+            raise ValueError(f"Priority must be between {p_min} and {p_max}")
         self._priority = value
 
     @buy.setter
@@ -93,11 +104,175 @@ class GroceryItem:
         if not isinstance(value, int):
             raise ValueError("ID must be a valid UUID>")
         self._id = value
-        
 
+    def to_dict(self) -> dict:
+        """
+        Get the item as a record for saving.
+
+        Returns:
+            dict: The item attributes, keyed like the saved JSON file.
+        """
+        return {
+            "_name": self._name,
+            "_store": self._store,
+            "_cost": self._cost,
+            "_amount": self._amount,
+            "_priority": self._priority,
+            "_buy": self._buy,
+            "_id": self._id,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict):
+        """
+        Build an item from a saved record, checking every value with the
+        setters. Keys that are not item attributes are ignored.
+
+        Args:
+            record (dict): The item record, see to_dict().
+
+        Raises:
+            ValueError: If a value is not valid.
+
+        Returns:
+            GroceryItem: The item.
+        """
+        item = cls()
+        for key in RECORD_KEYS:
+            if key in record:
+                setattr(item, key.lstrip("_"), record[key])
+        return item
+
+
+def get_trusted_rows(records: list[dict]) -> list[tuple] | None:
+    """
+    Check a whole file of records at once, a column at a time.
+
+    Every record must have exactly the keys in RECORD_KEYS, every column
+    only the types in COLUMN_TYPES and every priority must be in range.
+    The checks run in C over each column instead of a setter call per
+    value.
+
+    Args:
+        records (list[dict]): The saved records.
+
+    Returns:
+        list[tuple] | None: The values of each record in RECORD_KEYS order,
+            or None if any record needs the setters.
+    """
+    try:
+        if set(map(len, records)) - {len(RECORD_KEYS)}:
+            return None
+
+        rows = list(map(itemgetter(*RECORD_KEYS), records))
+
+    except (KeyError, TypeError):
+        return None
+
+    if not rows:
+        return rows
+
+    columns = list(zip(*rows))
+
+    for column, types in zip(columns, COLUMN_TYPES):
+        if not set(map(type, column)) <= types:
+            return None
+
+    priorities = columns[RECORD_KEYS.index("_priority")]
+    if not (
+        constants.PRIORITY_MIN <= min(priorities)
+        and max(priorities) <= constants.PRIORITY_MAX
+    ):
+        return None
+
+    return rows
+
+
+def items_from_rows(rows) -> list[GroceryItem]:
+    """
+    Build items directly from rows of values that are known to be valid,
+    without the defaults or the setters.
+
+    Args:
+        rows (iterable[tuple]): The values of each item in RECORD_KEYS order.
+
+    Returns:
+        list[GroceryItem]: The items in the order of the rows.
+    """
+    items = []
+    new_item = GroceryItem.__new__
+
+    # Nothing built here refers back to itself, so there is nothing for
+    # the cycle collector to find while a large list is built
+    gc_enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        for row in rows:
+            item = new_item(GroceryItem)
+            (
+                item._name, item._store, item._cost, item._amount,
+                item._priority, item._buy, item._id,
+            ) = row
+            items.append(item)
+
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return items
+
+
+def columns_from_items(items) -> list[list]:
+    """
+    Get the values of items a column at a time, without a record per item.
+
+    Args:
+        items (list[GroceryItem]): The items.
+
+    Returns:
+        list[list]: One list of values per key, in RECORD_KEYS order.
+    """
+    return [list(map(attrgetter(key), items)) for key in RECORD_KEYS]
+
+
+def items_from_records(records: list[dict]) -> list[GroceryItem]:
+    """
+    Build items from a loaded file of records.
+
+    The records are checked once as a whole, see get_trusted_rows(). If
+    they pass, the items are built directly, if not every record goes
+    through the validating setters.
+
+    Args:
+        records (list[dict]): The saved records.
+
+    Raises:
+        ValueError: If a record is not valid.
 
+    Returns:
+        list[GroceryItem]: The items in the order of the records.
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
 
+    try:
+        rows = get_trusted_rows(records)
+    finally:
+        if gc_enabled:
+            gc.enable()
 
+    if rows is not None:
+        return items_from_rows(rows)
 
+    return [
+        build_record_item(number, record)
+        for number, record in enumerate(records, start=1)
+    ]
 
 
+def build_record_item(number: int, record: dict) -> GroceryItem:
+    try:
+        return GroceryItem.from_record(record)
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"Item {number}: {error}") from None
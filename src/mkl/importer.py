@@ -0,0 +1,204 @@
+"""
+importer.py
+Streams grocery items from CSV or JSONL into a GroceryList.
+
+Rows are read one at a time and checked with the same rules as the
+GroceryItem setters. Valid rows are added in chunks, each chunk saved with
+one write, and bad rows are reported without stopping the import. Only one
+chunk of rows is held in memory at a time. Storage that rewrites the whole
+list, like json, is written once after the last chunk instead.
+
+CSV files need a header row. Both formats use the columns name, store,
+cost, amount, priority and buy, missing columns get the default values.
+"""
+import contextlib
+import csv
+import itertools
+import json
+import os
+import sys
+
+import mkl.constants as constants
+from mkl.grocery_item import GroceryItem
+
+IMPORT_FORMATS = ["csv", "jsonl"]
+
+
+def get_import_format(path: str) -> str:
+    """
+    Guess the import format from a file extension.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        str: One of IMPORT_FORMATS.
+    """
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+
+    if extension in ("jsonl", "ndjson", "json"):
+        return "jsonl"
+    return "csv"
+
+
+def iter_rows(file, import_format: str):
+    """
+    Stream rows from an open file.
+
+    Args:
+        file (TextIO): The file to read.
+        import_format (str): One of IMPORT_FORMATS.
+
+    Yields:
+        tuple[int, dict | Exception]: The line number and the row, or the
+            error if the line could not be parsed.
+    """
+    if import_format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_num, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield line_num, ValueError(f"Invalid JSON: {error.msg}")
+            continue
+
+        if not isinstance(row, dict):
+            yield line_num, ValueError("Row must be a JSON object")
+            continue
+
+        yield line_num, row
+
+
+def parse_buy(value) -> bool:
+    if isinstance(value, str):
+        value = value.strip().lower()
+
+        if value in constants.BUY_TRUE:
+            return True
+
+        if value in constants.BUY_FALSE:
+            return False
+
+        raise ValueError(
+            f"Buy must be one of {constants.BUY_TRUE + constants.BUY_FALSE}"
+        )
+
+    return value
+
+
+def build_item(row: dict) -> GroceryItem:
+    """
+    Build a validated GroceryItem from an imported row.
+
+    Text values, as read from CSV, are converted to the column type first.
+    Every value then goes through the GroceryItem setters.
+
+    Args:
+        row (dict): The row, keyed by column name.
+
+    Raises:
+        ValueError: If a value is not valid.
+
+    Returns:
+        GroceryItem: The item, without an id.
+    """
+    # Accept saved records too, their keys start with an underscore
+    row = {
+        key.lstrip("_"): value
+        for key, value in row.items()
+        if key and value not in (None, "")
+    }
+
+    grocery_item = GroceryItem()
+
+    if "name" in row:
+        grocery_item.name = row["name"]
+
+    if "store" in row:
+        grocery_item.store = row["store"]
+
+    if "cost" in row:
+        cost = row["cost"]
+        grocery_item.cost = float(cost) if isinstance(cost, str) else cost
+
+    if "amount" in row:
+        amount = row["amount"]
+        grocery_item.amount = int(amount) if isinstance(amount, str) else amount
+
+    if "priority" in row:
+        priority = row["priority"]
+        grocery_item.priority = (
+            int(priority) if isinstance(priority, str) else priority
+        )
+
+    if "buy" in row:
+        grocery_item.buy = parse_buy(row["buy"])
+
+    return grocery_item
+
+
+def import_items(
+    grocery_list,
+    file,
+    import_format: str,
+    chunk_size: int = constants.IMPORT_CHUNK_SIZE,
+    errors=None,
+) -> tuple[int, int]:
+    """
+    Import every row of a file into the grocery list.
+
+    Storage that appends is written once per chunk. Snapshot storage, see
+    mkl.storage, is written once at the end, rewriting the whole list per
+    chunk would make the import quadratic.
+
+    Args:
+        grocery_list (GroceryList): The list to add the items to.
+        file (TextIO): The open CSV or JSONL file.
+        import_format (str): One of IMPORT_FORMATS.
+        chunk_size (int): How many rows are read at once, and saved with
+            each write to storage that appends.
+        errors (TextIO | None): Where bad rows are reported, stderr if None.
+
+    Returns:
+        tuple[int, int]: The number of imported items and of bad rows.
+    """
+    errors = errors or sys.stderr
+    imported = 0
+    skipped = 0
+    rows = iter_rows(file, import_format)
+
+    # A batch around every chunk's batch, which joins it
+    outer_batch = (
+        grocery_list.batch() if grocery_list.storage.snapshot else contextlib.nullcontext()
+    )
+    with outer_batch:
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            items = []
+            for line_num, row in chunk:
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    items.append(build_item(row))
+
+                except ValueError as error:
+                    skipped += 1
+                    print(f"Line {line_num}: {error}", file=errors)
+
+            with grocery_list.batch():
+                for grocery_item in items:
+                    grocery_list.append_item(grocery_item)
+
+            imported += len(items)
+
+    return imported, skipped
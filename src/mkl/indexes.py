@@ -0,0 +1,303 @@
+"""
+indexes.py
+In-memory indexes, sorted views and running totals over the items of a
+GroceryList.
+
+GroceryList builds an index the first time it is needed and then keeps it
+up to date on every add, edit and remove, so lookups never rescan the list.
+Every index has the same small interface:
+
+-build(items): fill the index from scratch.
+-add(item): index a new or edited item.
+-discard(item): forget an item, called before it is edited or removed.
+"""
+import functools
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+
+# Sorts after every other character, used as the end of a prefix range
+PREFIX_END = chr(0x10FFFF)
+
+
+def get_name_key(name: str) -> str:
+    """Get the case-folded key used to search item names."""
+    return name.casefold()
+
+
+def get_trigrams(text: str) -> set[str]:
+    """
+    Split text into the three letter pieces used for fuzzy matching.
+
+    Each word is padded so its start and end get their own trigrams,
+    "milk" gives "  m", " mi", "mil", "ilk" and "lk ".
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        set[str]: The trigrams.
+    """
+    trigrams = set()
+
+    for word in text.casefold().split():
+        padded = f"  {word} "
+        for start in range(len(padded) - 2):
+            trigrams.add(padded[start:start + 3])
+
+    return trigrams
+
+
+class PrefixIndex:
+    """
+    Case-folded item names kept in sorted order for prefix searches.
+
+    The keys and ids are two parallel lists sorted by key, so a lookup is
+    two binary searches plus the matches, O(log n + k).
+    """
+
+    def __init__(self):
+        self.keys: list[str] = []
+        self.ids: list[int] = []
+
+    def build(self, items) -> None:
+        pairs = sorted((get_name_key(item.name), item.id) for item in items)
+        self.keys = [key for key, _ in pairs]
+        self.ids = [id for _, id in pairs]
+
+    def add(self, item) -> None:
+        key = get_name_key(item.name)
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.ids.insert(position, item.id)
+
+    def discard(self, item) -> None:
+        key = get_name_key(item.name)
+        position = bisect_left(self.keys, key)
+        end = bisect_right(self.keys, key, lo=position)
+
+        for index in range(position, end):
+            if self.ids[index] == item.id:
+                del self.keys[index]
+                del self.ids[index]
+                return
+
+    def search(self, prefix: str) -> list[int]:
+        """
+        Find the items whose name starts with a prefix, ignoring case.
+
+        Args:
+            prefix (str): The start of the name.
+
+        Returns:
+            list[int]: The ids of the matching items, sorted by name.
+        """
+        key = get_name_key(prefix)
+        start = bisect_left(self.keys, key)
+        end = bisect_left(self.keys, key + PREFIX_END, lo=start)
+
+        return self.ids[start:end]
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigrams to item ids, over names and stores.
+
+    A fuzzy search only looks at items that share a trigram with the
+    query. Each candidate is scored by trigram similarity, shared trigrams
+    over all trigrams of the query and the text, for its name and its store,
+    and keeps the better of the two.
+    """
+
+    fields = ("name", "store")
+
+    def __init__(self):
+        self.postings = {field: {} for field in self.fields}
+        # Trigram count of each field, by item id
+        self.sizes: dict[int, tuple[int, ...]] = {}
+
+    def build(self, items) -> None:
+        self.postings = {field: {} for field in self.fields}
+        self.sizes = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item) -> None:
+        sizes = []
+
+        for field in self.fields:
+            trigrams = get_trigrams(getattr(item, field))
+            postings = self.postings[field]
+
+            for trigram in trigrams:
+                postings.setdefault(trigram, set()).add(item.id)
+            sizes.append(len(trigrams))
+
+        self.sizes[item.id] = tuple(sizes)
+
+    def discard(self, item) -> None:
+        if self.sizes.pop(item.id, None) is None:
+            return
+
+        for field in self.fields:
+            postings = self.postings[field]
+
+            for trigram in get_trigrams(getattr(item, field)):
+                ids = postings.get(trigram)
+                if ids is None:
+                    continue
+
+                ids.discard(item.id)
+                if not ids:
+                    del postings[trigram]
+
+    def search(self, query: str, limit: int, min_score: float) -> list[tuple]:
+        """
+        Find the items whose name or store is most like the query.
+
+        Args:
+            query (str): The text to match, typos allowed.
+            limit (int): The most results to return.
+            min_score (float): The lowest similarity to keep, 0 to 1.
+
+        Returns:
+            list[tuple[float, int]]: The score and id of each match, best
+                first.
+        """
+        query_trigrams = get_trigrams(query)
+        if not query_trigrams:
+            return []
+
+        scores = {}
+
+        for field_num, field in enumerate(self.fields):
+            postings = self.postings[field]
+            shared = Counter()
+
+            for trigram in query_trigrams:
+                ids = postings.get(trigram)
+                if ids:
+                    shared.update(ids)
+
+            for id, count in shared.items():
+                size = self.sizes[id][field_num]
+                score = count / (len(query_trigrams) + size - count)
+
+                if score > scores.get(id, 0.0):
+                    scores[id] = score
+
+        return heapq.nlargest(
+            limit,
+            ((score, id) for id, score in scores.items() if score >= min_score),
+        )
+
+
+class TotalsIndex:
+    """
+    Running totals of the list, updated in O(1) on every change.
+
+    Counts every item, and sums the cost (amount times cost) of the items
+    to buy, overall and grouped by store and by priority. A group is dropped
+    when its last item is, so its sum never keeps float leftovers.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.buy_count = 0
+        self.buy_cost = 0.0
+        # [item count, buy count, buy cost] of each group
+        self.stores: dict[str, list] = {}
+        self.priorities: dict[int, list] = {}
+
+    def build(self, items) -> None:
+        self.__init__()
+        for item in items:
+            self.add(item)
+
+    def add(self, item) -> None:
+        self.update(item, 1)
+
+    def discard(self, item) -> None:
+        self.update(item, -1)
+
+    def update(self, item, sign: int) -> None:
+        buy = 1 if item.buy else 0
+        cost = item.amount * item.cost * sign if buy else 0.0
+
+        self.count += sign
+        self.buy_count += buy * sign
+        self.buy_cost = self.buy_cost + cost if self.buy_count else 0.0
+
+        for groups, key in ((self.stores, item.store), (self.priorities, item.priority)):
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [0, 0, 0.0]
+
+            group[0] += sign
+            group[1] += buy * sign
+            group[2] = group[2] + cost if group[1] else 0.0
+
+            if not group[0]:
+                del groups[key]
+
+
+class SortedView:
+    """
+    The items kept sorted by one attribute, for showing the list in another
+    order without sorting or saving it.
+
+    Entries are (value, id) pairs in one sorted list, so a change is a
+    binary search plus a list insert or delete, and reading the order is a
+    walk of the list. Items with equal values are in id order.
+
+    Args:
+        attribute (str): One of SORT_ATTRIBUTES.
+    """
+
+    def __init__(self, attribute: str):
+        if attribute not in SORT_ATTRIBUTES:
+            raise ValueError(f"Cannot sort by {attribute}")
+
+        self.attribute = attribute
+        self.entries: list[tuple] = []
+
+    def build(self, items) -> None:
+        attribute = self.attribute
+        self.entries = sorted((getattr(item, attribute), item.id) for item in items)
+
+    def add(self, item) -> None:
+        insort(self.entries, (getattr(item, self.attribute), item.id))
+
+    def discard(self, item) -> None:
+        entry = (getattr(item, self.attribute), item.id)
+        position = bisect_left(self.entries, entry)
+
+        if position < len(self.entries) and self.entries[position] == entry:
+            del self.entries[position]
+
+    def iter_ids(self, reverse: bool = False):
+        """
+        Walk the ids in sorted order.
+
+        Args:
+            reverse (bool): Largest value first.
+
+        Yields:
+            int: The item ids.
+        """
+        entries = reversed(self.entries) if reverse else self.entries
+        for _, id in entries:
+            yield id
+
+
+SORT_ATTRIBUTES = ["name", "store", "cost", "amount", "priority"]
+
+INDEX_CLASSES = {
+    "name": PrefixIndex,
+    "trigram": TrigramIndex,
+    "totals": TotalsIndex,
+    **{
+        f"sort_{attribute}": functools.partial(SortedView, attribute)
+        for attribute in SORT_ATTRIBUTES
+    },
+}
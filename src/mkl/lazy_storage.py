@@ -0,0 +1,433 @@
+"""
+lazy_storage.py
+Memory-mapped JSONL storage backend for GroceryList.
+
+Items are decoded only when they are read, so opening the list and
+running read-only commands costs the same for ten items or a million.
+
+Two files make up the store:
+-grocery_list.jsonl: one JSON record per line, only ever appended to. An
+ edit appends the new record, a removal appends {"_removed": <id>}. An
+ edit of the id first appends {"_replaced": <old id>, "_by": <new id>}, so
+ the old id's line is known to be stale.
+-grocery_list.idx: a header and one fixed size entry per item in list
+ order, holding the item id and the offset of its newest line.
+
+Both files are opened with mmap. The index is a cache of the data file, if
+it does not match (for example after a crash) it is rebuilt from the data,
+holding the storage lock exclusively, see mkl.locking.
+The data file is rewritten without stale lines once enough of it is dead.
+"""
+import json
+import mmap
+import os
+import struct
+
+import mkl.constants as constants
+from mkl.locking import StorageLock
+
+# Data file size, line count and removed entry count
+HEADER = struct.Struct("<QQQ")
+# Item id and offset of its line in the data file
+ENTRY = struct.Struct("<16sQ")
+REMOVED = 2**64 - 1
+
+
+def id_to_bytes(item_id: int) -> bytes:
+    try:
+        return item_id.to_bytes(16, "big")
+    except OverflowError:
+        raise ValueError(f"ID must be a valid UUID, {item_id}") from None
+
+
+def dump_line(record: dict) -> bytes:
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+
+class LazyStorage:
+    """Stores the grocery list as memory-mapped JSONL with an offset index."""
+
+    extension = "jsonl"
+    queryable = True
+    snapshot = False
+    trusted = False
+
+    def __init__(self, base_path: str):
+        self.path = f"{base_path}.{self.extension}"
+        self.index_path = f"{base_path}.{constants.LAZY_INDEX_EXTENSION}"
+        # The lock of GroceryList, joined when the thread already holds it
+        self.lock = StorageLock(self.path)
+
+        self.data_map = None
+        self.index_map = None
+        self.data_size = 0
+        self.line_count = 0
+        self.removed_count = 0
+        self.entry_count = 0
+        # Position of each id in the index, built on first lookup
+        self.positions: dict[int, int] | None = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    # Opening=================================
+
+    def open(self) -> None:
+        """Map both files, rebuilding the index if it is stale."""
+        if self.index_map is not None:
+            return
+
+        if self.is_index_stale():
+            with self.lock.hold(exclusive=True):
+                # Another process may have rebuilt it while this one waited
+                if self.is_index_stale():
+                    self.rebuild_index()
+
+        self.data_map = self.map_file(self.path) if self.exists() else b""
+        self.index_map = self.map_file(self.index_path)
+
+        self.data_size, self.line_count, self.removed_count = (
+            HEADER.unpack_from(self.index_map)
+        )
+        self.entry_count = (len(self.index_map) - HEADER.size) // ENTRY.size
+
+    def is_index_stale(self) -> bool:
+        data_size = os.path.getsize(self.path) if self.exists() else 0
+
+        try:
+            with open(self.index_path, "rb") as file:
+                header = file.read(HEADER.size)
+                index_size = os.fstat(file.fileno()).st_size
+
+        except FileNotFoundError:
+            return True
+
+        return bool(
+            len(header) < HEADER.size
+            or HEADER.unpack(header)[0] != data_size
+            or (index_size - HEADER.size) % ENTRY.size
+        )
+
+    @staticmethod
+    def map_file(path: str):
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        for file_map in (self.data_map, self.index_map):
+            if isinstance(file_map, mmap.mmap):
+                file_map.close()
+
+        self.data_map = None
+        self.index_map = None
+
+    def reset(self) -> None:
+        """Unmap both files, another process appended to or rewrote them."""
+        self.close()
+        self.positions = None
+
+    def rebuild_index(self) -> None:
+        """
+        Rebuild the index by scanning the data file. The lock must be held
+        exclusively, a torn last line is cut from the data file.
+        """
+        # Id and offset of each entry in list order, and the entry of each id
+        entries = []
+        positions = {}
+        offset = 0
+        line_count = 0
+
+        if self.exists():
+            with open(self.path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        # A torn last line from an interrupted write
+                        break
+
+                    record = json.loads(line)
+                    if "_replaced" in record:
+                        # The id was edited, the entry keeps its position
+                        position = positions.pop(record["_replaced"], None)
+                        if position is not None:
+                            entries[position][0] = record["_by"]
+                            positions[record["_by"]] = position
+                    else:
+                        item_id = record.get("_removed", record.get("_id"))
+                        line_offset = REMOVED if "_removed" in record else offset
+
+                        position = positions.get(item_id)
+                        if position is None:
+                            positions[item_id] = len(entries)
+                            entries.append([item_id, line_offset])
+                        else:
+                            entries[position][1] = line_offset
+
+                    offset += len(line)
+                    line_count += 1
+
+            if offset != os.path.getsize(self.path):
+                os.truncate(self.path, offset)
+
+        removed_count = sum(1 for _, line_offset in entries if line_offset == REMOVED)
+
+        # Swapped in whole, other processes may have the old index mapped
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(HEADER.pack(offset, line_count, removed_count))
+            for item_id, line_offset in entries:
+                file.write(ENTRY.pack(id_to_bytes(item_id), line_offset))
+        os.replace(temp_path, self.index_path)
+
+    # Reading=================================
+
+    def iter_entries(self):
+        """
+        Stream the live index entries in list order.
+
+        Yields:
+            tuple[int, bytes, int]: The position, id and data offset.
+        """
+        self.open()
+        index_map = self.index_map
+
+        for position in range(self.entry_count):
+            raw_id, offset = ENTRY.unpack_from(
+                index_map, HEADER.size + position * ENTRY.size
+            )
+            if offset != REMOVED:
+                yield position, raw_id, offset
+
+    def read_record(self, offset: int) -> dict:
+        end = self.data_map.find(b"\n", offset)
+        return json.loads(self.data_map[offset:end])
+
+    def count(self) -> int:
+        self.open()
+        return self.entry_count - self.removed_count
+
+    def load(self) -> list[dict]:
+        return list(self.iter_records())
+
+    def get_positions(self) -> dict[int, int]:
+        if self.positions is None:
+            self.positions = {
+                int.from_bytes(raw_id, "big"): position
+                for position, raw_id, _ in self.iter_entries()
+            }
+        return self.positions
+
+    def get_record(self, item_id: int) -> dict:
+        """
+        Get one item record by id.
+
+        The positions are mapped once and may be stale if another process
+        wrote since, so the record read is checked and the files are mapped
+        again once if it is not the item asked for.
+
+        Raises:
+            KeyError: If there is no item with the id.
+        """
+        while True:
+            fresh = self.positions is None
+            position = self.get_positions().get(item_id)
+
+            if position is not None:
+                _, offset = ENTRY.unpack_from(
+                    self.index_map, HEADER.size + position * ENTRY.size
+                )
+                if offset != REMOVED:
+                    record = self.read_record(offset)
+                    if record.get("_id") == item_id:
+                        return record
+
+            if fresh:
+                raise KeyError(item_id)
+            self.reset()
+
+    def iter_records(
+        self,
+        prefix: str | None = None,
+        buy: bool | None = None,
+        order_by: str | None = None,
+        reverse: bool = False,
+    ):
+        """
+        Stream item records matching the filters, decoding one at a time.
+
+        Args:
+            prefix (str | None): Only names starting with this, ignoring case.
+            buy (bool | None): Only items with this buy flag.
+            order_by (str | None): Attribute to sort the matches by, list
+                order if None. Sorting holds the matches in memory.
+            reverse (bool): Sort in descending order.
+
+        Yields:
+            dict: The matching item records.
+        """
+        records = (
+            self.read_record(offset) for _, _, offset in self.iter_entries()
+        )
+
+        if prefix:
+            name_key = prefix.casefold()
+            records = (
+                record for record in records
+                if record["_name"].casefold().startswith(name_key)
+            )
+
+        if buy is not None:
+            records = (record for record in records if record["_buy"] == buy)
+
+        if order_by:
+            key = f"_{order_by}"
+            records = sorted(
+                records, key=lambda record: record[key], reverse=reverse
+            )
+
+        yield from records
+
+    # Writing=================================
+
+    def save(self, records) -> None:
+        """
+        Write a full snapshot, dropping every stale line.
+
+        Args:
+            records (iterable[dict]): Every item record in list order, may
+                be a stream from this same store.
+        """
+        temp_path = f"{self.path}.tmp"
+        temp_index_path = f"{self.index_path}.tmp"
+        offset = 0
+        line_count = 0
+
+        with open(temp_path, "wb") as data, open(temp_index_path, "wb") as index:
+            index.write(HEADER.pack(0, 0, 0))
+
+            for record in records:
+                line = dump_line(record)
+                data.write(line)
+                index.write(ENTRY.pack(id_to_bytes(record["_id"]), offset))
+                offset += len(line)
+                line_count += 1
+
+            index.seek(0)
+            index.write(HEADER.pack(offset, line_count, 0))
+
+        self.close()
+        self.positions = None
+        os.replace(temp_path, self.path)
+        os.replace(temp_index_path, self.index_path)
+
+    def write_changes(self, changes: list[dict], get_records) -> None:
+        """
+        Append change records to the data file and patch the index.
+
+        Args:
+            changes (list[dict]): The change records, oldest first.
+            get_records (callable): Unused, the store rewrites itself.
+        """
+        run = []
+
+        for change in changes:
+            if change["op"] != "sort":
+                run.append(change)
+                continue
+
+            self.append_changes(run)
+            run = []
+
+            records = sorted(
+                self.iter_records(),
+                key=lambda record: record[f"_{change['attribute']}"],
+                reverse=change["reverse"],
+            )
+            self.save(records)
+
+        self.append_changes(run)
+
+        if self.needs_compaction():
+            self.save(self.iter_records())
+
+    def append_changes(self, changes: list[dict]) -> None:
+        if not changes:
+            return
+
+        self.open()
+        if any(change["op"] != "add" for change in changes):
+            self.get_positions()
+
+        lines = []
+        # Index entries to write, by position
+        entries = {}
+        offset = self.data_size
+
+        for change in changes:
+            op = change["op"]
+
+            if op == "add":
+                record = change["item"]
+                position = self.entry_count
+                self.entry_count += 1
+                line_offset = offset
+
+            elif op == "edit":
+                record = change["item"]
+                position = self.positions.pop(change["id"], None)
+                if position is None:
+                    # Removed since, for example by another process
+                    continue
+
+                if record["_id"] != change["id"]:
+                    # Tells a rebuild of the index the old line is stale
+                    line = dump_line({"_replaced": change["id"], "_by": record["_id"]})
+                    lines.append(line)
+                    offset += len(line)
+
+                line_offset = offset
+
+            elif op == "remove":
+                position = self.positions.pop(change["id"], None)
+                if position is None:
+                    continue
+
+                record = {"_removed": change["id"]}
+                line_offset = REMOVED
+                self.removed_count += 1
+
+            else:
+                raise ValueError(f"Unknown change operation: {op}")
+
+            item_id = change["id"] if op == "remove" else record["_id"]
+            entries[position] = ENTRY.pack(id_to_bytes(item_id), line_offset)
+            if self.positions is not None and op != "remove":
+                self.positions[item_id] = position
+
+            line = dump_line(record)
+            lines.append(line)
+            offset += len(line)
+
+        self.close()
+
+        with open(self.path, "ab") as data:
+            data.write(b"".join(lines))
+
+        with open(self.index_path, "r+b") as index:
+            for position in sorted(entries):
+                index.seek(HEADER.size + position * ENTRY.size)
+                index.write(entries[position])
+
+            self.line_count += len(lines)
+            index.seek(0)
+            index.write(HEADER.pack(offset, self.line_count, self.removed_count))
+
+    def needs_compaction(self) -> bool:
+        self.open()
+
+        if self.line_count < constants.LAZY_MIN_LINES:
+            return False
+
+        dead_lines = self.line_count - self.count()
+        return dead_lines / self.line_count >= constants.LAZY_MAX_DEAD_RATIO
@@ -0,0 +1,144 @@
+"""
+locking.py
+Advisory file lock and generation counter shared by every process that
+opens the same grocery list storage.
+
+Next to the data file sits a small lock file holding a generation number.
+Writers hold an exclusive fcntl lock only while they write, and bump the
+generation when they are done. Loading holds a shared lock, so it never
+reads a half written file.
+
+A process remembers the state it last loaded or wrote: the generation plus
+the size and modification time of the data file. If the state on disk is
+the same, nothing else wrote since and the copy in memory is current.
+Otherwise it merges its own changes into what is on disk, see
+GroceryList.commit_changes().
+
+Without fcntl (Windows) the lock does nothing, the generation still
+detects other writers.
+"""
+import contextlib
+import os
+import threading
+
+import mkl.constants as constants
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Lock file descriptor and exclusive flag of every lock file each thread
+# holds, by lock file path
+HELD = threading.local()
+
+
+class StorageLock:
+    """
+    The lock file of one storage file.
+
+    Args:
+        data_path (str): The storage data file.
+    """
+
+    def __init__(self, data_path: str):
+        self.data_path = data_path
+        self.path = f"{data_path}.{constants.LOCK_EXTENSION}"
+
+    def get_held(self) -> dict[str, tuple[int, bool]]:
+        if not hasattr(HELD, "locks"):
+            HELD.locks = {}
+        return HELD.locks
+
+    @property
+    def fd(self) -> int | None:
+        held = self.get_held().get(self.path)
+        return held[0] if held else None
+
+    @contextlib.contextmanager
+    def hold(self, exclusive: bool = False):
+        """
+        Hold the lock for the block. Every thread opens the lock file
+        itself, so threads of one process also exclude each other.
+
+        A thread already holding the lock, through any StorageLock of the
+        same file, joins it. Asking for it exclusively while holding it
+        shared upgrades it for the block. The upgrade is not atomic, another
+        writer may go first, so check the files again once it is held.
+
+        Args:
+            exclusive (bool): Lock out every other holder, for writing.
+                Shared holders only lock out exclusive ones.
+        """
+        locks = self.get_held()
+        held = locks.get(self.path)
+
+        if held is not None:
+            fd, held_exclusive = held
+            if held_exclusive or not exclusive:
+                # Already held by this thread, join it
+                yield self
+                return
+
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            locks[self.path] = (fd, True)
+            try:
+                yield self
+            finally:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_SH)
+                locks[self.path] = (fd, False)
+            return
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            locks[self.path] = (fd, exclusive)
+            yield self
+        finally:
+            # Closing releases the lock
+            locks.pop(self.path, None)
+            os.close(fd)
+
+    def read_generation(self) -> int:
+        fd = self.fd
+        if fd is not None:
+            data = os.pread(fd, 8, 0)
+        else:
+            try:
+                with open(self.path, "rb") as file:
+                    data = file.read(8)
+            except FileNotFoundError:
+                data = b""
+
+        return int.from_bytes(data, "little") if len(data) == 8 else 0
+
+    def get_state(self) -> tuple[int, int, int]:
+        """
+        Get the state of the storage on disk, cheap enough to check before
+        every read.
+
+        Returns:
+            tuple[int, int, int]: The generation, and the modification time
+                in nanoseconds and size of the data file.
+        """
+        try:
+            stat = os.stat(self.data_path)
+            file_state = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            file_state = (0, 0)
+
+        return (self.read_generation(), *file_state)
+
+    def bump(self) -> tuple[int, int, int]:
+        """
+        Record a write, the lock must be held exclusively.
+
+        Returns:
+            tuple[int, int, int]: The new state, see get_state().
+        """
+        generation = self.read_generation() + 1
+        os.pwrite(self.fd, generation.to_bytes(8, "little"), 0)
+        return self.get_state()
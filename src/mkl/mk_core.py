@@ -14,25 +14,76 @@ Functions are:
 Author: Mike Kwiatkowsky
 Version: 3.0.0
 """
+import contextlib
+import functools
+import itertools
 import logging
 import os
-import re
+import sys
 import uuid
 
 import mkl.constants as constants
+import mkl.exporter as exporter
+import mkl.indexes as indexes
+import mkl.perf as perf
+import mkl.storage as storage
+from mkl.locking import StorageLock
 import mkl.utils as utils
-from mkl.grocery_item import GroceryItem
+from mkl.columnar import ItemColumns
+from mkl.grocery_item import (
+    GroceryItem, columns_from_items, items_from_records, items_from_rows,
+)
 
 class GroceryList:
     
-    def __init__(self):
-        self.grocery_list_path = os.path.join(
-            constants.EXPORT_PATH, f"{constants.GROCERY_LIST}.json"
+    def __init__(self, storage_format: str | None = None):
+        self.storage_format = storage_format or constants.STORAGE_FORMAT
+        self.storage = storage.get_storage(
+            self.storage_format,
+            os.path.join(constants.EXPORT_PATH, constants.GROCERY_LIST),
         )
+        self.grocery_list_path = self.storage.path
+        # Shared with other processes using the same data file
+        self.storage_lock = StorageLock(self.storage.path)
+        # Storage state when last loaded or written, see StorageLock.get_state()
+        self.storage_state: tuple[int, int, int] | None = None
         self.items_by_id: dict[int, GroceryItem] = {}
         
-        self.grocery_list = []
+        self._grocery_list = None
+        # Change records held back by batch(), None outside a batch
+        self.pending_changes: list[dict] | None = None
+        # Steps to put the list in memory back if the batch fails
+        self.undo_log: list[tuple] = []
+        # Items touched by a batch while queryable storage is not loaded,
+        # None marks a removed item
+        self.batch_items: dict[int, GroceryItem | None] = {}
+        # Indexes over the loaded list, built on first use
+        self.indexes: dict[str, object] = {}
+        # Changes applied in memory but not saved yet, None unless writes
+        # are held, see hold_writes()
+        self.unsaved_changes: list[dict] | None = None
+        # Called after every change to the loaded list, see add_listener()
+        self.listeners: list = []
         self.set_grocery_list()
+
+    @property
+    def grocery_list(self) -> list[GroceryItem]:
+        """The items in list order, loaded from storage on first use."""
+        if self._grocery_list is None:
+            with self.storage_lock.hold():
+                self.storage_state = self.storage_lock.get_state()
+                self._grocery_list = self.load_data()
+            self.rebuild_id_dict()
+            self.reset_indexes()
+        return self._grocery_list
+
+    @grocery_list.setter
+    def grocery_list(self, value: list[GroceryItem]) -> None:
+        self._grocery_list = value
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._grocery_list is not None
     
     def add_item(self, name, store, cost, amount, priority, buy):
         """
@@ -47,9 +98,6 @@ class GroceryList:
             buy (bool): Whether the item should be bought
             id (int): Automatically generated
         """
-        #  Generate a random UUID
-        unique_id = int(uuid.uuid4())
-
         grocery_item = GroceryItem()
         grocery_item.name = name
         grocery_item.store = store
@@ -57,14 +105,55 @@ class GroceryList:
         grocery_item.amount = amount
         grocery_item.priority = priority
         grocery_item.buy = buy
+
+        return self.append_item(grocery_item)
+
+    def append_item(self, grocery_item: GroceryItem) -> GroceryItem:
+        """
+        Add an item that was already built and validated to the list.
+
+        Args:
+            grocery_item (GroceryItem): The item, it gets a new id.
+
+        Returns:
+            GroceryItem: The added item.
+        """
+        #  Generate a random UUID
+        unique_id = int(uuid.uuid4())
         grocery_item.id = unique_id
 
-        self.grocery_list.append(grocery_item)
-        self.items_by_id[unique_id] = grocery_item
-        self.save_data()
+        # Queryable storage inserts the row without loading the list
+        if self.is_loaded or not self.storage.queryable:
+            self.grocery_list.append(grocery_item)
+            self.items_by_id[unique_id] = grocery_item
+            self.index_add(grocery_item)
+            self.record_undo("add", grocery_item)
+            self.notify("add", grocery_item, unique_id)
+        elif self.pending_changes is not None:
+            self.batch_items[unique_id] = grocery_item
+
+        self.save_change({"op": "add", "item": grocery_item.to_dict()})
         logging.info(
-            f"Added: {name} {store} {cost} {amount} {priority} {buy} {unique_id}"
+            f"Added: {grocery_item.name} {grocery_item.store} "
+            f"{grocery_item.cost} {grocery_item.amount} "
+            f"{grocery_item.priority} {grocery_item.buy} {unique_id}"
         )
+
+        return grocery_item
+
+    def add_items(self, items) -> list[GroceryItem]:
+        """
+        Add many items with one write.
+
+        Args:
+            items (iterable[dict]): The add_item() arguments for each item,
+                keyed by name, store, cost, amount, priority and buy.
+
+        Returns:
+            list[GroceryItem]: The added items.
+        """
+        with self.batch():
+            return [self.add_item(**item) for item in items]
         
     def remove_item(self, name: str, id: int) -> None:
         
@@ -77,26 +166,62 @@ class GroceryList:
         Returns:
             str: _return item as a string
         """
-        item=self.items_by_id.pop(id)
-
-        self.save_data()
+        self.pop_item(id)
         utils.show_warning(title="SUCCESS", msg=f"{name} was removed")
 
+    def pop_item(self, id: int) -> GroceryItem:
+        """
+        Remove an item from the list without any message.
+
+        Args:
+            id (int): the assigned id for the item
+
+        Returns:
+            GroceryItem: The removed item.
+        """
+        item = self.get_item(id)
+        if self.is_loaded:
+            index = self.grocery_list.index(item)
+            del self.grocery_list[index]
+            self.items_by_id.pop(id)
+            self.index_discard(item)
+            self.record_undo("remove", item, index)
+            self.notify("remove", item, id)
+        elif self.pending_changes is not None:
+            self.batch_items[id] = None
+
+        self.save_change({"op": "remove", "id": id})
+        return item
+
+    def remove_items(self, ids) -> list[GroceryItem]:
+        """
+        Remove many items with one write.
+
+        Args:
+            ids (iterable[int]): The ids of the items to remove.
+
+        Returns:
+            list[GroceryItem]: The removed items.
+        """
+        with self.batch():
+            return [self.pop_item(id) for id in ids]
 
     def set_grocery_list(self):
         os.makedirs(constants.EXPORT_PATH, exist_ok=True)
         
-        if os.path.exists(self.grocery_list_path):
-            grocery_list = self.load_data()
+        # Items are loaded on first use of grocery_list
+        self._grocery_list = None
+        self.items_by_id.clear()
+        self.reset_indexes()
 
-        else:
-            # Create and empty grocery list and save.
-            print("No json path found, creating JSON path")
-            grocery_list = []
-            self.save_data()
-            
-        self.grocery_list = grocery_list
-        self.rebuild_id_dict()
+        if not self.storage.exists():
+            with self.storage_lock.hold(exclusive=True):
+                # Another process may have created it while we waited
+                if not self.storage.exists():
+                    # Create and empty grocery list and save.
+                    print("No json path found, creating JSON path")
+                    self.storage.save([])
+                    self.storage_lock.bump()
 
     def rebuild_id_dict(self) -> None:
         self.items_by_id.clear()
@@ -104,31 +229,274 @@ class GroceryList:
         for item in self.grocery_list:
             self.items_by_id[item.id] = item
 
-    def search_item_name(self, search_item):
+    def get_index(self, name: str):
+        """
+        Get an index over the loaded list, building it on first use.
+
+        Args:
+            name (str): The index name, see mkl.indexes.INDEX_CLASSES.
+
+        Returns:
+            object: The index, kept up to date by every change.
+        """
+        index = self.indexes.get(name)
+
+        if index is None:
+            index = self.build_index(name)
+            self.indexes[name] = index
+
+        return index
+
+    def build_index(self, name: str, items=None):
+        """
+        Build an index without keeping it.
+
+        A worker thread can build one over a snapshot of the list while the
+        list keeps changing on its own thread.
+
+        Args:
+            name (str): The index name, see mkl.indexes.INDEX_CLASSES.
+            items (iterable[GroceryItem] | None): The items to index, the
+                loaded list if None.
+
+        Returns:
+            object: The new index.
+        """
+        index = indexes.INDEX_CLASSES[name]()
+        index.build(self.grocery_list if items is None else items)
+        return index
+
+    def reset_indexes(self) -> None:
+        """Drop every index, they are rebuilt on next use."""
+        self.indexes.clear()
+
+    def index_add(self, item: GroceryItem) -> None:
+        for index in self.indexes.values():
+            index.add(item)
+
+    def index_discard(self, item: GroceryItem) -> None:
+        for index in self.indexes.values():
+            index.discard(item)
+
+    def add_listener(self, listener) -> None:
+        """
+        Call listener after every change to the loaded list, so a view can
+        update only what changed.
+
+        The listener is called as listener(op, item, id), with:
+        - ("add", item, id) after an item was appended
+        - ("edit", item, old_id) after an item changed, old_id is its id
+          before the edit
+        - ("remove", item, id) after an item was removed
+        - ("reset", None, None) when the whole list may have changed: after
+          a sort, a failed batch, or a reload of changes from other processes
+
+        Args:
+            listener (callable): The function to call.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        self.listeners.remove(listener)
+
+    def notify(self, op: str, item: GroceryItem | None = None, id: int | None = None) -> None:
+        for listener in self.listeners:
+            listener(op, item, id)
+
+    def get_item(self, id: int) -> GroceryItem:
+        """
+        Get an item by id.
+
+        Queryable storage fetches the single item while the list is not
+        loaded, other storage loads the list.
+
+        Args:
+            id (int): the assigned id for the item
+
+        Returns:
+            GroceryItem: The item.
+        """
+        if not self.is_loaded and self.storage.queryable:
+            if self.pending_changes is None:
+                return self.item_from_record(self.storage.get_record(id))
+
+            # Storage has not seen the batch yet, keep what it changed
+            if id not in self.batch_items:
+                self.batch_items[id] = self.item_from_record(
+                    self.storage.get_record(id)
+                )
+            if self.batch_items[id] is None:
+                raise KeyError(id)
+            return self.batch_items[id]
+
+        # Reading grocery_list loads it and fills items_by_id
+        self.grocery_list
+        return self.items_by_id[id]
+
+    def iter_items(self, buy: bool | None = None):
+        """
+        Iterate over the items in list order without loading the list
+        when the storage can stream them.
+
+        Args:
+            buy (bool | None): Only items with this buy flag.
+
+        Yields:
+            GroceryItem: The items.
+        """
+        if not self.is_loaded and self.storage.queryable:
+            for record in self.storage.iter_records(buy=buy):
+                yield self.item_from_record(record)
+            return
+
+        for item in self.grocery_list:
+            if buy is None or item.buy == buy:
+                yield item
+
+    def iter_records(self):
+        """
+        Iterate over every item as a saved record, without building
+        GroceryItems when the list is not loaded.
+
+        Yields:
+            dict: The item records in list order.
+        """
+        if self.is_loaded:
+            for item in self.grocery_list:
+                yield item.to_dict()
+
+        elif self.storage.queryable:
+            yield from self.storage.iter_records()
+
+        else:
+            yield from self.storage.load()
+
+    def get_columns(self) -> ItemColumns:
+        """
+        Get a compact, column-oriented copy of the list.
+
+        Returns:
+            ItemColumns: The items as typed columns, see mkl.columnar.
+        """
+        return ItemColumns.from_records(self.iter_records())
+
+    def search_item_name(self, search_item, name_index=None, items_by_id=None):
         """
         Finds items in the grocery list whose name starts with the given search string.
 
+        The search ignores case and uses the name index, so it costs
+        O(log n + matches) instead of a scan of the list.
+
         Args:
             search_item (str): The searcg string to match the start of the item names
+            name_index (PrefixIndex | None): Search this index instead of
+                the list's own, see build_index().
+            items_by_id (dict | None): The items of the ids in name_index,
+                the list's own if None.
 
         Returns:
-            _type_: _description_
+            list[GroceryItem]: The matching items, sorted by name.
         """
-        matching_items = []
-        pattern = rf"^{search_item}"
-        
-        for item in self.grocery_list:
-            if re.match(pattern, item.name, re.IGNORECASE):
-                matching_items.append(item)
-        return matching_items
+        if name_index is None and not self.is_loaded and self.storage.queryable:
+            return [
+                self.item_from_record(record)
+                for record in self.storage.iter_records(
+                    prefix=search_item, order_by="name"
+                )
+            ]
+
+        if name_index is None:
+            name_index = self.get_index("name")
+        if items_by_id is None:
+            items_by_id = self.items_by_id
+        return [items_by_id[id] for id in name_index.search(search_item)]
+
+    def search_item_fuzzy(
+        self,
+        search_item: str,
+        limit: int = constants.FUZZY_LIMIT,
+        min_score: float = constants.FUZZY_MIN_SCORE,
+        trigram_index=None,
+        items_by_id=None,
+    ) -> list[GroceryItem]:
+        """
+        Finds items whose name or store is close to the search string,
+        so typos like "bannana" still find "banana".
+
+        Uses the trigram index, only items sharing part of the search
+        string are scored.
+
+        Args:
+            search_item (str): The search string.
+            limit (int): The most items to return.
+            min_score (float): The lowest similarity to keep, 0 to 1.
+            trigram_index (TrigramIndex | None): Search this index instead
+                of the list's own, see build_index().
+            items_by_id (dict | None): The items of the ids in
+                trigram_index, the list's own if None.
+
+        Returns:
+            list[GroceryItem]: The matching items, best match first.
+        """
+        if trigram_index is None:
+            trigram_index = self.get_index("trigram")
+        matches = trigram_index.search(search_item, limit, min_score)
+
+        if items_by_id is None:
+            items_by_id = self.items_by_id
+        return [items_by_id[id] for _, id in matches]
     
+    def iter_sorted(self, attribute: str, reverse: bool = False):
+        """
+        Iterate over the items sorted by an attribute, without changing or
+        saving the list.
+
+        A loaded list keeps a sorted view per attribute, built on first use
+        and updated on every change, so this is a walk of the view. Items
+        with equal values are in id order. Queryable storage sorts its own
+        rows instead of loading the list.
+
+        Args:
+            attribute (str): One of indexes.SORT_ATTRIBUTES.
+            reverse (bool): Largest value first.
+
+        Yields:
+            GroceryItem: The items.
+        """
+        if attribute not in indexes.SORT_ATTRIBUTES:
+            raise ValueError(f"Cannot sort by {attribute}")
+
+        if not self.is_loaded and self.storage.queryable:
+            for record in self.storage.iter_records(order_by=attribute, reverse=reverse):
+                yield self.item_from_record(record)
+            return
+
+        view = self.get_index(f"sort_{attribute}")
+        items_by_id = self.items_by_id
+        for id in view.iter_ids(reverse):
+            yield items_by_id[id]
+
     def sort_items(self, attribute, reverse=False):
-        self.grocery_list = sorted(
-            self.grocery_list,
-            key=lambda item: getattr(item, attribute),
-            reverse=reverse
+        """
+        Sort the list and save the new order. To only show the list in
+        another order, use iter_sorted().
+
+        Args:
+            attribute (str): The attribute to sort by.
+            reverse (bool): Largest value first.
+        """
+        # Queryable storage sorts its own rows, only sort a loaded list
+        if self.is_loaded or not self.storage.queryable:
+            self.record_undo("sort", self.grocery_list)
+            self.grocery_list = sorted(
+                self.grocery_list,
+                key=lambda item: getattr(item, attribute),
+                reverse=reverse
+            )
+            self.notify("reset")
+        self.save_change(
+            {"op": "sort", "attribute": attribute, "reverse": reverse}
         )
-        self.save_data()
         
     def get_index_from_id(self, id):
         """
@@ -186,76 +554,174 @@ class GroceryList:
             id (str | None): Updated id.
         """
 
-        current_item = self.items_by_id[id]
-
+        fields = {}
         if name:
-            current_item.name = name
-        
+            fields["name"] = name
+
         if store:
-            current_item.store = store
-            
+            fields["store"] = store
+
         if cost:
-            current_item.cost = cost
-            
+            fields["cost"] = cost
+
         if amount:
-            current_item.amount = amount
-            
+            fields["amount"] = amount
+
         if priority:
-            current_item.priority = priority
-        
+            fields["priority"] = priority
+
         if buy == "skip":
             # keep existing value
             pass
         else:
-            current_item.buy = buy
+            fields["buy"] = buy
 
-        if id:
-            current_item.id = id
+        self.set_item_fields(id, fields)
 
-        self.save_data()
+    def set_item_fields(self, id: int, fields: dict) -> None:
+        """
+        Set the given fields of an item, every value is set as given, even
+        0 or an empty string.
 
-    def export_items(self):
-        """_The export_items() function will export the items that may have
-        been edited, removed or added to the list, 
-        creating a new list called the buy_list.
+        Args:
+            id (int): The id of the item.
+            fields (dict): The new value of each field to change, by
+                GroceryItem attribute name.
         """
-        buy_list = []
-        for item in self.grocery_list:
-            if item.buy:
-                buy_list.append(item)
-            
-        if buy_list:
-            self.list_items(buy_list)
+        current_item = self.get_item(id)
+        old_id = current_item.id
+        if self.is_loaded:
+            self.record_undo("edit", current_item, current_item.to_dict())
+            self.index_discard(current_item)
 
-            total_cost = self.calculate_total_cost(buy_list, round_cost=True)
-            print(f"The total cost is ${total_cost}")
-            print(utils.get_line_delimiter())
+        try:
+            for field, value in fields.items():
+                setattr(current_item, field, value)
 
-            exported_list_file = os.path.join(
-                constants.EXPORT_PATH, constants.EXPORT_LIST
-            )
+        finally:
+            # Index whatever the item holds, even after a bad value
+            if self.is_loaded:
+                self.index_add(current_item)
+                self.notify("edit", current_item, old_id)
 
-            with open(exported_list_file, "w") as f:
-                item_num = 1
-
-                for item in buy_list:
-                    item_string = (
-                        f"item {item_num} "
-                        f"|name: {item.name} "
-                        f"|store: {item.store} "
-                        f"|cost: {item.cost} "
-                        f"|amount: {item.amount} "
-                        f"|priority: {item.priority} "
-                        f"|buy: {item.buy} "
-                        )
-                    
-                    f.write(item_string + "\n")
-                    item_num += 1
-
-                f.write("\n")
-                f.write(f"The total cost is ${total_cost}")
-            
-            return exported_list_file
+        self.save_change(
+            {"op": "edit", "id": old_id, "item": current_item.to_dict()}
+        )
+
+    def edit_items(self, edits: dict) -> None:
+        """
+        Edit many items with one write.
+
+        Args:
+            edits (dict[int, dict]): The fields to set for each item, keyed
+                by item id, see set_item_fields(). Missing fields keep the
+                current value.
+        """
+        with self.batch():
+            for id, fields in edits.items():
+                self.set_item_fields(id, fields)
+
+    def export_items(
+        self,
+        path: str | None = None,
+        export_format: str | None = None,
+        quiet: bool = False,
+    ) -> str | None:
+        """
+        Stream the items to buy to a file, or to stdout, and print their
+        total cost.
+
+        The items are read, formatted and written one chunk at a time, so
+        memory stays the same for any list size.
+
+        Args:
+            path (str | None): The file to write, "-" for stdout. Defaults
+                to constants.EXPORT_LIST in constants.EXPORT_PATH.
+            export_format (str | None): One of exporter.EXPORT_FORMATS,
+                guessed from the file extension if None.
+            quiet (bool): Don't print every item while exporting.
+
+        Returns:
+            str | None: The file written, None if there is nothing to buy.
+        """
+        buy_items = self.iter_items(buy=True)
+        first_item = next(buy_items, None)
+        if first_item is None:
+            return None
+        buy_items = itertools.chain([first_item], buy_items)
+
+        if path is None:
+            path = os.path.join(constants.EXPORT_PATH, constants.EXPORT_LIST)
+        export_format = export_format or exporter.get_export_format(path)
+
+        to_stdout = path == "-"
+        # Items are only echoed when they are not the output itself
+        echo = None if quiet or to_stdout else sys.stdout
+        summary = sys.stderr if to_stdout else sys.stdout
+
+        if echo:
+            print("ITEMS: ")
+
+        with contextlib.ExitStack() as stack:
+            if to_stdout:
+                file = sys.stdout
+            else:
+                file = stack.enter_context(
+                    open(path, "w", buffering=constants.EXPORT_BUFFER_SIZE, newline="")
+                )
+
+            _, total_cost = exporter.write_items(file, buy_items, export_format, echo)
+            total_cost = self.apply_tax(total_cost, True, constants.TAX_RATE)
+            exporter.write_total(file, export_format, total_cost)
+
+        print(f"The total cost is ${total_cost}", file=summary)
+        print(utils.get_line_delimiter(), file=summary)
+
+        return path
+
+    def export_split(
+        self,
+        directory: str | None = None,
+        export_format: str = "text",
+        split_by: str = "store",
+        quiet: bool = False,
+    ) -> str | None:
+        """
+        Export the items to buy as one file per store, each with its own
+        total cost, and an index file with the grand total.
+
+        Args:
+            directory (str | None): Where to write the files. Defaults to
+                constants.EXPORT_SPLIT_FOLDER in constants.EXPORT_PATH.
+            export_format (str): One of exporter.EXPORT_FORMATS.
+            split_by (str): One of exporter.SPLIT_FIELDS.
+            quiet (bool): Don't print the total of every file.
+
+        Returns:
+            str | None: The index file, None if there is nothing to buy.
+        """
+        if directory == "-":
+            raise ValueError("A split export needs a folder, not stdout")
+
+        directory = directory or os.path.join(
+            constants.EXPORT_PATH, constants.EXPORT_SPLIT_FOLDER
+        )
+        index = exporter.export_split(
+            self.iter_items(buy=True), directory, export_format, split_by
+        )
+        if not index["parts"]:
+            return None
+
+        if not quiet:
+            for part in index["parts"]:
+                print(
+                    f"| {split_by}: {part[split_by]} | items: {part['items']} "
+                    f"| total cost: ${part['total_cost']} | file: {part['file']}"
+                )
+        print(f"The grand total is ${index['total_cost']}")
+        print(utils.get_line_delimiter())
+
+        return os.path.join(directory, constants.EXPORT_INDEX)
                 
     @staticmethod       
     def list_items(items)-> str:
@@ -264,25 +730,52 @@ class GroceryList:
         Returns:
             str: -items as a string
         """
-        item_num = 1
         print("ITEMS: ")
-        for item in items:
-            item_string = (
-                f"item {item_num}. "
-                f"| name: {item.name} "
-                f"| store: {item.store} "
-                f"| cost: {item.cost} "
-                f"| amount: {item.amount} "
-                f"| priority: {item.priority} "
-                f"| buy: {item.buy} "
-            )
-            print(item_string)  
+        for start, chunk in exporter.iter_chunks(items):
+            sys.stdout.write(exporter.format_list(chunk, start))
+
+    def get_totals(self) -> indexes.TotalsIndex:
+        """
+        Get the running totals of the list, built on first use and then
+        updated on every add, edit and remove.
+
+        Returns:
+            TotalsIndex: The counts, and the cost of the items to buy overall,
+                by store and by priority.
+        """
+        return self.get_index("totals")
+
+    def get_total_cost(
+        self, round_cost: bool = False, tax: float = constants.TAX_RATE
+    ) -> float:
+        """
+        Get the cost of the items to buy from the running totals, like
+        calculate_total_cost() over them but without a scan.
+
+        Args:
+            round_cost (bool): Round to cents before adding tax.
+            tax (float): The tax rate to add.
+
+        Returns:
+            float: The total cost after applying tax and optional rounding.
+        """
+        return self.apply_tax(self.get_totals().buy_cost, round_cost, tax)
+
+    @staticmethod
+    def apply_tax(total_cost: float, round_cost: bool, tax: float) -> float:
+        if round_cost:
+            total_cost = round(total_cost, 2)
+            
+        if tax:
+            total_cost += total_cost * tax
+
+        return total_cost
 
     @staticmethod
     def calculate_total_cost( 
         grocery_list: list[object], 
         round_cost: bool = False,
-        tax: float = 0.08,
+        tax: float = constants.TAX_RATE,
         ):
         """_Parameters
         grocery_list (list[dict]): A list of dictionaries where each dictionary represents
@@ -299,36 +792,362 @@ class GroceryList:
             cost = item.amount * item.cost
             total_cost += cost
 
-        if round_cost:
-            total_cost = round(total_cost, 2)
-            
-        if tax:
-            total_cost += total_cost * tax
-
-        return total_cost
+        return GroceryList.apply_tax(total_cost, round_cost, tax)
     
-    def save_data(self):
-        export_list = []
+    def get_records(self) -> list[dict]:
+        """
+        Get every item as a record for saving.
 
-        for item in self.grocery_list:
-            export_list.append(vars(item))
+        Returns:
+            list[dict]: The item records in list order.
+        """
+        return [item.to_dict() for item in self.grocery_list]
+
+    def save_change(self, change: dict) -> None:
+        """
+        Persist a change that was already applied to the list in memory.
+
+        Args:
+            change (dict): The change record, see mkl.storage.
+        """
+        if self.pending_changes is not None:
+            self.pending_changes.append(change)
+            return
+
+        self.write_changes([change])
+
+    def write_changes(self, changes: list[dict]) -> None:
+        if not changes:
+            return
+
+        if self.unsaved_changes is not None:
+            self.unsaved_changes.extend(changes)
+            return
+
+        self.commit_changes(changes)
+
+    def commit_changes(self, changes: list[dict]) -> None:
+        """
+        Write changes to storage under the exclusive storage lock.
+
+        If another process wrote since the list was loaded, our changes are
+        replayed on top of what it saved before writing, so neither side
+        loses its changes. The lock is held only while writing.
+
+        Args:
+            changes (list[dict]): The change records, oldest first.
+        """
+        with self.storage_lock.hold(exclusive=True):
+            stale = self.storage_lock.get_state() != self.storage_state
+            if stale:
+                self.storage.reset()
+                if self.is_loaded and not self.storage.queryable:
+                    self.merge_storage(changes)
+
+            self.storage.write_changes(changes, self.get_records)
+
+            if stale and self.is_loaded and self.storage.queryable:
+                # Rows were updated in place, reload the others' on next use
+                self.unload()
+
+            self.storage_state = self.storage_lock.bump()
+
+    def merge_storage(self, changes: list[dict]) -> None:
+        """
+        Replace the list in memory with storage plus changes of our own.
+        The storage lock must be held.
+
+        Args:
+            changes (list[dict]): The change records not in storage yet.
+        """
+        records = storage.replay_changes(self.storage.load(), changes)
+        items = items_from_records(records)
+
+        # New objects, so a reader on another thread never sees them half built
+        self.items_by_id = {item.id: item for item in items}
+        self.indexes = {}
+        self._grocery_list = items
+        self.notify("reset")
 
-        utils.save_data(self.grocery_list_path, export_list)
+    def unload(self) -> None:
+        """Drop the list in memory, it is loaded again on next use."""
+        self._grocery_list = None
+        self.items_by_id = {}
+        self.indexes = {}
+        self.notify("reset")
+
+    def refresh(self) -> bool:
+        """
+        Pick up changes written by other processes.
+
+        Costs a stat of the data and lock files when nothing changed, so it
+        can run before every read of a long running process. Held changes,
+        see hold_writes(), are kept on top of what was loaded.
+
+        Returns:
+            bool: True if storage had changed.
+        """
+        state = self.storage_lock.get_state()
+        if state == self.storage_state:
+            return False
+
+        self.storage_state = state
+        self.reload()
+        return True
+
+    def reload(self) -> None:
+        """Read storage again, keeping held changes on top of it."""
+        self.storage.reset()
+
+        if self.unsaved_changes:
+            with self.storage_lock.hold():
+                self.storage_state = self.storage_lock.get_state()
+                self.merge_storage(self.unsaved_changes)
+        elif self.is_loaded:
+            self.unload()
+
+    def hold_writes(self) -> None:
+        """
+        Keep changes in memory until flush() is called, so a writer can
+        save many of them with one write, away from the callers.
+
+        The list is loaded, since storage does not see the held changes.
+        """
+        self.grocery_list
+        if self.unsaved_changes is None:
+            self.unsaved_changes = []
+
+    def flush(self) -> int:
+        """
+        Save the changes held back by hold_writes() with one write.
+
+        The list must not change while the write runs, flush from the
+        same thread that changes it or lock around both.
+
+        Returns:
+            int: The number of changes saved.
+        """
+        changes = self.unsaved_changes
+        if not changes:
+            return 0
+
+        self.unsaved_changes = []
+        try:
+            self.commit_changes(changes)
+        except BaseException:
+            # Keep them for the next flush
+            self.unsaved_changes[:0] = changes
+            raise
+
+        return len(changes)
+
+    def take_changes(self) -> list[dict]:
+        """
+        Hand the changes held by hold_writes() to a writer on another
+        thread, see save_taken_changes(). Writes stay held.
+
+        Returns:
+            list[dict]: The change records, oldest first.
+        """
+        changes = self.unsaved_changes or []
+        if self.unsaved_changes is not None:
+            self.unsaved_changes = []
+        return changes
+
+    def save_taken_changes(self, changes: list[dict], get_records) -> bool:
+        """
+        Save changes from take_changes() on a worker thread, while the list
+        keeps changing on its own thread.
+
+        The list in memory is not read or replaced. If another process
+        wrote since the list was loaded, our changes are replayed on top of
+        what it saved, and the owner of the list must call reload() to see
+        the other process's changes.
+
+        Args:
+            changes (list[dict]): The change records, oldest first.
+            get_records (callable): Returns every item record in list order
+                once these changes are applied, built without reading the
+                list. Only called by storage that saves full snapshots.
+
+        Returns:
+            bool: True if another process had written, see reload().
+        """
+        with self.storage_lock.hold(exclusive=True):
+            stale = self.storage_lock.get_state() != self.storage_state
+            if stale:
+                self.storage.reset()
+                if not self.storage.queryable:
+                    records = self.storage.load()
+                    get_records = functools.partial(
+                        storage.replay_changes, records, changes
+                    )
+
+            self.storage.write_changes(changes, get_records)
+            self.storage_state = self.storage_lock.bump()
+
+        return stale
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Group changes so they are saved with one write.
+
+        Saving is held back until the outermost batch exits. If the batch
+        raises, the changes are dropped and the list in memory is put back
+        the way it was. Nested batches join the outer one.
+
+        Example:
+            with grocery_list.batch():
+                grocery_list.add_item("Milk", "Costco", 4.99, 2, 3, True)
+                grocery_list.add_item("Eggs", "Costco", 3.49, 1, 2, True)
+        """
+        if self.pending_changes is not None:
+            yield self
+            return
+
+        was_loaded = self.is_loaded
+        self.pending_changes = []
+        self.undo_log = []
+        self.batch_items = {}
+
+        try:
+            yield self
+
+        except BaseException:
+            self.pending_changes = None
+            self.batch_items = {}
+
+            if was_loaded:
+                self.undo_changes()
+            else:
+                # Nothing was saved, reload from storage on next use
+                self.grocery_list = None
+                self.items_by_id.clear()
+            self.reset_indexes()
+            self.undo_log = []
+            self.notify("reset")
+            raise
+
+        changes = self.pending_changes
+        self.pending_changes = None
+        self.undo_log = []
+        self.batch_items = {}
+        self.write_changes(changes)
+
+    def save_batch(self) -> None:
+        """
+        Save the changes of the open batch now, with any held by
+        hold_writes() before them, instead of when the batch exits.
+
+        If saving raises, let the error leave the batch, which puts the
+        list in memory back without the batch's changes. So a write that
+        was reported as failed is never saved by a later write.
+        """
+        changes = (self.unsaved_changes or []) + self.pending_changes
+        if not changes:
+            return
+
+        items_by_id = self.items_by_id
+        try:
+            self.commit_changes(changes)
+        except BaseException:
+            if self.items_by_id is not items_by_id:
+                # Merged with another process's save, the undo log no
+                # longer matches the list, load it from storage instead
+                self.undo_log = []
+                self.unload()
+            raise
+
+        if self.unsaved_changes is not None:
+            self.unsaved_changes = []
+        self.pending_changes = []
+
+    def record_undo(self, op: str, *args) -> None:
+        """
+        Remember how to reverse a change to the list in memory while a
+        batch is open, so a failed batch costs only the changes it made.
+
+        Args:
+            op (str): The change operation, add, edit, remove or sort.
+            args: The item and state needed to reverse it.
+        """
+        if self.pending_changes is not None:
+            self.undo_log.append((op, *args))
+
+    def undo_changes(self) -> None:
+        """Reverse the changes in the undo log, newest first."""
+        for op, *args in reversed(self.undo_log):
+            if op == "add":
+                item = args[0]
+                if self.grocery_list and self.grocery_list[-1] is item:
+                    self.grocery_list.pop()
+                else:
+                    self.grocery_list.remove(item)
+                self.items_by_id.pop(item.id, None)
+
+            elif op == "edit":
+                item, record = args
+                self.items_by_id.pop(item.id, None)
+                for key, value in record.items():
+                    setattr(item, key, value)
+                self.items_by_id[item.id] = item
+
+            elif op == "remove":
+                item, index = args
+                self.grocery_list.insert(index, item)
+                self.items_by_id[item.id] = item
+
+            elif op == "sort":
+                self.grocery_list = args[0]
+
+    def save_data(self):
+        """
+        Write a full snapshot of the list, replacing whatever is saved.
+        Trusted storage is given the values a column at a time, without a
+        record per item.
+        """
+        if self.storage.trusted:
+            columns = columns_from_items(self.grocery_list)
+            save = functools.partial(self.storage.save_columns, columns)
+        else:
+            save = functools.partial(self.storage.save, self.get_records())
+
+        with self.storage_lock.hold(exclusive=True):
+            save()
+            self.storage_state = self.storage_lock.bump()
 
     def load_data(self):
-        grocery_list = []
-        json_data = utils.load_data(self.grocery_list_path)
+        """
+        Load every item from storage.
+
+        Trusted storage checks its own data and hands back rows. Other
+        storage is trusted when it passes one check over each column. The
+        items of trusted data are built directly, otherwise every value is
+        validated.
 
-        for item in json_data:
-            grocery_item = GroceryItem()
-            for key, value in item.items():
+        Returns:
+            list[GroceryItem]: The items in list order.
+        """
+        if self.storage.trusted:
+            return items_from_rows(self.storage.load_rows())
 
-                # Ensure attribute exists
-                if hasattr(grocery_item, key):
-                    setattr(grocery_item, key, value)
+        return items_from_records(self.storage.load())
 
-            grocery_list.append(grocery_item)
+    @staticmethod
+    def item_from_record(record: dict) -> GroceryItem:
+        """
+        Build a GroceryItem from a saved record, validating every value.
+
+        Args:
+            record (dict): The item record, see GroceryItem.to_dict().
+
+        Returns:
+            GroceryItem: The item.
+        """
+        return GroceryItem.from_record(record)
 
-        return grocery_list
-    
 
+# Timing of the operations, only when MKL_PERF is set
+if perf.ENABLED:
+    perf.install(GroceryList, storage.STORAGE_CLASSES.values())
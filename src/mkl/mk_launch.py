@@ -1,18 +1,24 @@
 #!/usr/bin/env python
 
 import argparse
-from PyQt5 import QtWidgets
+import json
+import os
 import sys
 
 from mkl import mk_core
 from mkl import constants
+from mkl import daemon
+from mkl import exporter
+from mkl import importer
+from mkl import indexes
+from mkl import perf
+from mkl import startup
+from mkl import storage
 from mkl import utils
-from mkl.ui import mkl_ui
-from mkl.ui import mkl_ui, stylesheet
 
 class Launch:
-    def __init__(self):
-        self.grocery_app = mk_core.GroceryList()
+    def __init__(self, storage_format=None):
+        self.grocery_app = mk_core.GroceryList(storage_format=storage_format)
 
     def launch(self, mode="interactive") -> None:
         """
@@ -32,9 +38,13 @@ class Launch:
         elif mode == "cli":
             print("Use CLI mode from main()")
         elif mode == "ui":
+            # Qt is only imported for the UI, CLI commands start without it
+            from PyQt5 import QtWidgets
+            from mkl.ui import mkl_ui, stylesheet
+
             app = QtWidgets.QApplication(sys.argv)
             app.setStyleSheet(stylesheet.load_stylesheet())
-            ui = mkl_ui.GroceryApp()
+            ui = mkl_ui.GroceryApp(self.grocery_app)
             ui.show()
             app.exec_()
         else:
@@ -153,12 +163,12 @@ class Launch:
             for match in matches:
                 match_string = (
                     f"item {match_num} "
-                    f"| name: {match["name"]} "
-                    f"| store: {match["store"]} "
-                    f"| cost: {match["cost"]} "
-                    f"| amount: {match["amount"]} "
-                    f"| priority: {match["priority"]} "
-                    f"| buy: {match["buy"]}"
+                    f"| name: {match.name} "
+                    f"| store: {match.store} "
+                    f"| cost: {match.cost} "
+                    f"| amount: {match.amount} "
+                    f"| priority: {match.priority} "
+                    f"| buy: {match.buy}"
                 )
                 print(match_string)
                 match_num += 1
@@ -176,23 +186,170 @@ class Launch:
                 name, store, cost, amount, priority, buy, match_item.id
             )
 
-    def handle_list_command(self) -> None:
-        self.grocery_app.list_items(self.grocery_app.grocery_list)
+    def handle_list_command(self, args: argparse.Namespace | None = None) -> None:
+        if args and args.sort_by:
+            # Shown sorted, the saved order is unchanged
+            items = self.grocery_app.iter_sorted(args.sort_by, args.reverse)
+        else:
+            items = self.grocery_app.iter_items()
+        self.grocery_app.list_items(items)
+
+    def handle_sort_command(self, args: argparse.Namespace) -> None:
+        """
+        Sort the list and save the new order.
+        """
+        self.grocery_app.sort_items(args.attribute, reverse=args.reverse)
+        print(f"Sorted the list by {args.attribute}.")
+
+    def handle_totals_command(self) -> None:
+        """
+        Print the running totals: item counts and the cost of the items to
+        buy, overall, by store and by priority.
+        """
+        totals = self.grocery_app.get_totals()
+
+        print(f"Items: {totals.count}, to buy: {totals.buy_count}")
+        print(
+            f"Total cost: ${round(totals.buy_cost, 2)}, with tax: "
+            f"${round(self.grocery_app.get_total_cost(round_cost=True), 2)}"
+        )
+
+        for title, groups in (("store", totals.stores), ("priority", totals.priorities)):
+            print(utils.get_line_delimiter())
+            print(f"By {title}:")
+            for key, (count, buy_count, buy_cost) in sorted(groups.items()):
+                print(
+                    f"| {title}: {key} | items: {count} | to buy: {buy_count} "
+                    f"| cost: ${round(buy_cost, 2)}"
+                )
+
+    def handle_report_command(self, args: argparse.Namespace) -> None:
+        """
+        Print spend by store and priority, line cost percentiles and
+        histogram, and the most expensive lines, see mkl.analytics.
+        """
+        # NumPy is only imported for reports
+        from mkl import analytics
+
+        report = analytics.get_analytics(
+            self.grocery_app, engine=args.engine, buy_only=not args.all
+        )
+        lines = "lines" if args.all else "lines to buy"
+
+        print(f"Report over {len(report)} {lines} ({report.engine})")
+        print(f"Total cost: ${round(report.total_cost(round_cost=True), 2)} with tax")
+
+        for title, groups in (
+            ("store", report.spend_by_store()),
+            ("priority", report.spend_by_priority()),
+        ):
+            print(utils.get_line_delimiter())
+            print(f"Spend by {title}:")
+            for key, (count, spend) in sorted(
+                groups.items(), key=lambda group: group[1][1], reverse=True
+            ):
+                print(f"| {title}: {key} | lines: {count} | spend: ${round(spend, 2)}")
+
+        print(utils.get_line_delimiter())
+        print("Line cost percentiles:")
+        for percent, value in zip(args.percentiles, report.percentiles(args.percentiles)):
+            print(f"| p{percent:g}: ${round(value, 2)}")
+
+        print(utils.get_line_delimiter())
+        print("Line cost histogram:")
+        for start, end, count in report.histogram(args.bins):
+            print(f"| ${start:.2f} - ${end:.2f}: {count}")
+
+        print(utils.get_line_delimiter())
+        print(f"Top {args.top} lines:")
+        for name, store, line_cost in report.top_lines(args.top):
+            print(f"| name: {name} | store: {store} | cost: ${round(line_cost, 2)}")
 
-    def handle_search_command(self):
+    def handle_perf_command(self, args: argparse.Namespace) -> None:
+        """
+        Print the operation timings saved by commands run with MKL_PERF set,
+        see mkl.perf.
+        """
+        path = args.file or perf.get_perf_path()
+
+        if args.reset:
+            if os.path.exists(path):
+                os.remove(path)
+            print(f"Cleared {path}")
+            return
+
+        stats = perf.load_stats(path)
+        if not stats:
+            print(
+                f"No timings in {path}. Run commands with "
+                f"{constants.PERF_ENV}=1 to record them."
+            )
+            return
+
+        if args.json:
+            print(json.dumps({name: operation.to_dict() for name, operation in stats.items()}))
+            return
+
+        print(f"Timings from {path}")
+        print(perf.format_report(stats))
+
+    def handle_import_command(self, args: argparse.Namespace) -> None:
+        """
+        Import items from a CSV or JSONL file, or stdin when the file is '-'.
+        """
+        import_format = args.format
+
+        if args.file == "-":
+            import_format = import_format or "csv"
+            imported, skipped = importer.import_items(
+                self.grocery_app, sys.stdin, import_format, args.chunk_size
+            )
+        else:
+            import_format = import_format or importer.get_import_format(args.file)
+            with open(args.file, "r", newline="") as file:
+                imported, skipped = importer.import_items(
+                    self.grocery_app, file, import_format, args.chunk_size
+                )
+
+        print(f"Imported {imported} items, skipped {skipped} bad rows.")
+        print(utils.get_line_delimiter())
+
+    def handle_convert_command(self, args: argparse.Namespace) -> None:
+        """
+        Copy the grocery list into another storage format.
+        """
+        count = storage.convert_storage(
+            self.grocery_app.storage_format,
+            args.to,
+            os.path.join(constants.EXPORT_PATH, constants.GROCERY_LIST),
+        )
+        print(
+            f"Converted {count} items from {self.grocery_app.storage_format} "
+            f"to {args.to}. Use --storage {args.to} to open them."
+        )
+
+    def handle_search_command(self, args: argparse.Namespace | None = None):
         """
         Handles the logic triggered by the search command in command line mode.
         Search a keyword and print the matches
         """
-        # Get user imput for the search keyword
-        search_keyword = input(
-            "What is the name of the item you would like to search? "
-        )
+        if args and getattr(args, "query", None):
+            search_keyword = " ".join(args.query)
+            fuzzy = args.fuzzy
+        else:
+            # Get user imput for the search keyword
+            search_keyword = input(
+                "What is the name of the item you would like to search? "
+            )
+            fuzzy = False
         print(utils.get_line_delimiter())
 
         print("Searching for matching items...")
 
-        matches = self.grocery_app.search_item_name(search_keyword)
+        if fuzzy:
+            matches = self.grocery_app.search_item_fuzzy(search_keyword)
+        else:
+            matches = self.grocery_app.search_item_name(search_keyword)
 
         if matches:
 
@@ -374,7 +531,7 @@ class Launch:
 
         return buy
 
-def main() ->None:
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="MK Grocery List Manager")
     parser.add_argument(
         "--mode",
@@ -382,6 +539,30 @@ def main() ->None:
         default="interactive",
         help="Choose how to run the app: cli, ui, or interactive (default).",
     )
+    parser.add_argument(
+        "--storage",
+        choices=constants.STORAGE_FORMATS,
+        default=constants.STORAGE_FORMAT,
+        help="How the grocery list is saved (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        dest="startup_profile",
+        action="store_true",
+        help="Run the command with -X importtime and check its import time "
+        f"against the {constants.STARTUP_BUDGET_MS} ms budget.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run the command under cProfile and write its stats to a .pstats file.",
+    )
+    parser.add_argument(
+        "--profile-output",
+        dest="profile_output",
+        default=None,
+        help="The .pstats file of --profile (default: mkl-<command>.pstats).",
+    )
 
     subparsers = parser.add_subparsers(dest="command")
     # Add parser args
@@ -410,15 +591,163 @@ def main() ->None:
     )
     edit_parser.add_argument("--id", type=int, default=None, help="Item id to disambiguate when multiple items match")
 
-    subparsers.add_parser("list", help="List items")
-    subparsers.add_parser("export", help="Export items")
+    # List parser args
+    list_parser = subparsers.add_parser("list", help="List items")
+    list_parser.add_argument("--sort-by", dest="sort_by", choices=indexes.SORT_ATTRIBUTES, default=None, help="Show the items sorted by this attribute, the saved order is unchanged")
+    list_parser.add_argument("--reverse", action="store_true", help="Largest value first")
+
+    # Sort parser args
+    sort_parser = subparsers.add_parser("sort", help="Sort the list and save the new order")
+    sort_parser.add_argument("attribute", choices=indexes.SORT_ATTRIBUTES, help="Attribute to sort by")
+    sort_parser.add_argument("--reverse", action="store_true", help="Largest value first")
+    # Export parser args
+    export_parser = subparsers.add_parser("export", help="Export items")
+    export_parser.add_argument("--output", "-o", default=None, help="File to write, '-' for stdout. Defaults to the export file in the data folder")
+    export_parser.add_argument("--format", choices=exporter.EXPORT_FORMATS, default=None, help="File format, guessed from the extension if omitted (text otherwise)")
+    export_parser.add_argument("--quiet", "-q", action="store_true", help="Don't print every item while exporting")
+    export_parser.add_argument("--split-by", dest="split_by", choices=exporter.SPLIT_FIELDS, default=None, help="Write one file per store into the --output folder, plus an index file")
+    subparsers.add_parser("totals", help="Show item counts and the cost to buy, by store and priority")
+
+    # Report parser args
+    report_parser = subparsers.add_parser("report", help="Report spend, cost percentiles and the most expensive lines")
+    report_parser.add_argument("--engine", choices=["numpy", "python"], default=None, help="Compute with NumPy or plain Python, NumPy when installed if omitted")
+    report_parser.add_argument("--all", action="store_true", help="Report every item, not only the items to buy")
+    report_parser.add_argument("--top", type=int, default=10, help="Most expensive lines to show")
+    report_parser.add_argument("--bins", type=int, default=10, help="Ranges in the line cost histogram")
+    report_parser.add_argument("--percentiles", type=float, nargs="+", default=[50, 90, 99], help="Line cost percentiles to show")
 
     # Searcht parser args
     search_parser = subparsers.add_parser("search", help = "Search for items")
     search_parser.add_argument("query", nargs="+", help="Search prefix for item name.Use quotes for multi_word searches")
+    search_parser.add_argument("--fuzzy", action="store_true", help="Match names and stores that are close to the query, typos allowed")
+
+    # Import parser args
+    import_parser = subparsers.add_parser("import", help="Import items from CSV or JSONL")
+    import_parser.add_argument("file", nargs="?", default="-", help="File to import, '-' or omit for stdin")
+    import_parser.add_argument("--format", choices=importer.IMPORT_FORMATS, default=None, help="File format, guessed from the extension if omitted (stdin defaults to csv)")
+    import_parser.add_argument("--chunk-size", dest="chunk_size", type=int, default=constants.IMPORT_CHUNK_SIZE, help="Rows saved with each write")
+
+    # Convert parser args
+    convert_parser = subparsers.add_parser("convert", help="Convert the list to another storage format")
+    convert_parser.add_argument("--to", required=True, choices=constants.STORAGE_FORMATS, help="Storage format to convert to")
+
+    # Perf parser args
+    perf_parser = subparsers.add_parser("perf", help=f"Report operation timings recorded with {constants.PERF_ENV}=1")
+    perf_parser.add_argument("--file", default=None, help="Timings file, defaults to the one next to the data")
+    perf_parser.add_argument("--json", action="store_true", help="Print the raw counters as JSON")
+    perf_parser.add_argument("--reset", action="store_true", help="Delete the recorded timings")
+
+    # Serve parser args
+    subparsers.add_parser("serve", help="Keep the list in memory and run CLI commands sent over a local socket")
+
+    # Api parser args
+    api_parser = subparsers.add_parser("api", help="Serve the list as an HTTP/JSON API")
+    api_parser.add_argument("--host", default=constants.API_HOST, help="Address to listen on")
+    api_parser.add_argument("--port", type=int, default=constants.API_PORT, help="Port to listen on")
+
+    return parser
+
 
+def run_command(app: Launch, args: argparse.Namespace) -> None:
+    """Run a parsed CLI command."""
+    if not args.command:
+        print(
+            "Please provide a command (like 'add', 'remove', 'edit', 'list', 'sort', 'export', 'totals', 'report', 'search', 'import', 'convert', 'perf', 'serve', 'api')"
+        )
+        return
+
+    match args.command:
+        case "add":
+            app.handle_add_command(args)
+        case "remove":
+            app.handle_remove_command()
+        case "edit":
+            app.handle_edit_command()
+        case "list":
+            app.handle_list_command(args)
+        case "sort":
+            app.handle_sort_command(args)
+        case "export" if args.split_by:
+            app.grocery_app.export_split(
+                args.output, args.format or "text", args.split_by, args.quiet
+            )
+        case "export":
+            app.grocery_app.export_items(args.output, args.format, args.quiet)
+        case "totals":
+            app.handle_totals_command()
+        case "report":
+            app.handle_report_command(args)
+        case "search":
+            app.handle_search_command(args)
+        case "import":
+            app.handle_import_command(args)
+        case "convert":
+            app.handle_convert_command(args)
+        case "perf":
+            app.handle_perf_command(args)
+        case "serve" | "api":
+            print(f"mkl {args.command} can not run through mkl serve")
+
+
+def main() ->None:
+    parser = build_parser()
     args = parser.parse_args()
-    app = Launch()
+
+    if args.startup_profile:
+        argv = [arg for arg in sys.argv[1:] if arg != "--startup-profile"]
+        sys.exit(startup.profile_startup(argv, ui=args.mode == "ui"))
+
+    if args.profile:
+        import cProfile
+
+        path = args.profile_output or f"mkl-{args.command or args.mode}.pstats"
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(run_main, parser, args)
+        finally:
+            profiler.dump_stats(path)
+            print(f"Profile written to {path}, open it with pstats or snakeviz", file=sys.stderr)
+        return
+
+    run_main(parser, args)
+
+
+def run_main(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Run the mode or command picked on the command line."""
+    if args.command == "serve":
+        app = Launch(storage_format=args.storage)
+
+        def run_argv(argv: list[str]) -> int:
+            command_args = parser.parse_args(argv)
+            # Another process, like the UI or mkl api, may have written
+            app.grocery_app.refresh()
+            run_command(app, command_args)
+            return 0
+
+        daemon.serve(daemon.get_socket_path(args.storage), run_argv)
+        return
+
+    if args.command == "api":
+        from mkl import api_server
+
+        api_server.run(
+            mk_core.GroceryList(storage_format=args.storage), args.host, args.port
+        )
+        return
+
+    # A profile is of this process, run the command here
+    if args.mode == "cli" and args.command and not args.profile:
+        argv = sys.argv[1:]
+        # The server resolves paths from its own directory
+        path = args.file if args.command == "import" else getattr(args, "output", None)
+        if path and path != "-" and path in argv:
+            argv[len(argv) - 1 - argv[::-1].index(path)] = os.path.abspath(path)
+
+        status = daemon.forward_command(args, argv)
+        if status is not None:
+            sys.exit(status)
+
+    app = Launch(storage_format=args.storage)
 
     if args.mode == "interactive":
         app.launch(mode="interactive")
@@ -427,25 +756,7 @@ def main() ->None:
         app.launch(mode="ui")
 
     elif args.mode == "cli":
-        if not args.command:
-            print(
-                "Please provide a command (like 'add', 'remove', 'edit', 'list', 'export', 'search')"
-            )
-            return
-
-        match args.command:
-            case "add":
-                app.handle_add_command(args)
-            case "remove":
-                app.handle_remove_command()
-            case "edit":
-                app.handle_edit_command()
-            case "list":
-                app.grocery_app.list_items(app.grocery_app.grocery_list)
-            case "export":
-                app.grocery_app.export_items()
-            case "search":
-                app.handle_search_command()
+        run_command(app, args)
 
 
 # Call the function
@@ -0,0 +1,337 @@
+"""
+perf.py
+Call counts, latencies and storage bytes of GroceryList operations.
+
+Off unless the MKL_PERF environment variable is set. Off, nothing is
+wrapped and the only cost is reading the variable on import. On, install()
+wraps the main GroceryList methods and every storage backend's load and
+save methods, and each call records its time. Storage calls also record
+the bytes of the files they read and wrote.
+
+MKL_PERF=1 adds the counters of the process to the perf file next to the
+data when it exits, so `mkl perf` can report over many commands.
+MKL_PERF=<path> uses that file instead.
+
+Latency percentiles are taken from a sample of at most
+constants.PERF_SAMPLES calls of each operation. Generators, like
+GroceryList.iter_items(), are not timed.
+"""
+import functools
+import json
+import os
+import time
+
+import mkl.constants as constants
+
+ENABLED = os.environ.get(constants.PERF_ENV, "") not in ("", "0")
+
+# Wrapped by install()
+GROCERY_LIST_OPERATIONS = [
+    "add_item",
+    "add_items",
+    "pop_item",
+    "remove_items",
+    "edit_item",
+    "edit_items",
+    "get_item",
+    "search_item_name",
+    "search_item_fuzzy",
+    "sort_items",
+    "calculate_total_cost",
+    "get_totals",
+    "get_total_cost",
+    "export_items",
+    "export_split",
+    "load_data",
+    "save_data",
+    "commit_changes",
+    "flush",
+    "refresh",
+]
+# Storage methods wrapped by install(), by how they use the files
+STORAGE_ACCESS = {
+    "load": "read",
+    "load_rows": "read",
+    "get_record": "lookup",
+    "save": "save",
+    "save_columns": "save",
+    "write_changes": "append",
+}
+
+
+class OperationStats:
+    """
+    The calls of one operation.
+
+    Args:
+        samples (list[float] | None): Latencies to start from, in seconds.
+    """
+
+    __slots__ = ("calls", "total", "samples", "bytes_read", "bytes_written")
+
+    def __init__(self, samples: list[float] | None = None):
+        self.calls = 0
+        self.total = 0.0
+        self.samples = samples or []
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def record(self, elapsed: float) -> None:
+        self.calls += 1
+        self.total += elapsed
+
+        if len(self.samples) < constants.PERF_SAMPLES:
+            self.samples.append(elapsed)
+        else:
+            import random
+
+            # Reservoir sampling, every call has the same chance to be kept
+            slot = random.randrange(self.calls)
+            if slot < constants.PERF_SAMPLES:
+                self.samples[slot] = elapsed
+
+    def percentile(self, percent: float) -> float:
+        """Get a latency percentile in seconds, from the sample."""
+        if not self.samples:
+            return 0.0
+
+        values = sorted(self.samples)
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+    def merge(self, other: "OperationStats") -> None:
+        """Add the calls of another process."""
+        import random
+
+        samples = self.samples + other.samples
+        if len(samples) > constants.PERF_SAMPLES:
+            samples = random.sample(samples, constants.PERF_SAMPLES)
+
+        self.calls += other.calls
+        self.total += other.total
+        self.samples = samples
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "OperationStats":
+        stats = cls()
+        for slot in cls.__slots__:
+            setattr(stats, slot, record[slot])
+        return stats
+
+
+# Counters of this process, by operation name
+STATS: dict[str, OperationStats] = {}
+
+
+def get_stats(name: str) -> OperationStats:
+    stats = STATS.get(name)
+    if stats is None:
+        stats = STATS[name] = OperationStats()
+    return stats
+
+
+# Wrapping==================================
+
+
+def timed(name: str, function):
+    """Wrap a function so every call records its time under name."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            get_stats(name).record(time.perf_counter() - start)
+
+    return wrapper
+
+
+def get_storage_files(store) -> list[str]:
+    """Get every file a storage backend may read or write."""
+    paths = [
+        value for key, value in vars(store).items()
+        if key.endswith("path") and isinstance(value, str)
+    ]
+    # SQLite writes to its write-ahead log first
+    return paths + [f"{path}-wal" for path in paths]
+
+
+def stat_files(paths: list[str]) -> dict[str, tuple[int, int, int]]:
+    """Get the inode, modification time and size of the files that exist."""
+    states = {}
+
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        states[path] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    return states
+
+
+def storage_timed(name: str, function, access: str):
+    """
+    Wrap a storage method so every call records its time, and the bytes
+    of the files it read, or of what it wrote to them.
+
+    Args:
+        name (str): The operation name.
+        function (callable): The method.
+        access (str): "lookup" counts no bytes, it reads one record.
+            "read" counts the files read whole. "save" counts
+            every file it changed as written whole. "append" counts what
+            the files grew by, or the whole file if it was replaced or
+            shrank, a rewrite in place is counted by the save it calls.
+    """
+
+    @functools.wraps(function)
+    def wrapper(store, *args, **kwargs):
+        paths = get_storage_files(store)
+        before = stat_files(paths)
+        start = time.perf_counter()
+        try:
+            return function(store, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats = get_stats(name)
+            stats.record(elapsed)
+
+            if access == "lookup":
+                pass
+            elif access == "read":
+                stats.bytes_read += sum(size for _, _, size in before.values())
+            else:
+                for path, state in stat_files(paths).items():
+                    old_inode, _, old_size = before.get(path, (None, None, 0))
+                    inode, _, size = state
+                    if state == before.get(path):
+                        continue
+                    if access == "save" or inode != old_inode or size < old_size:
+                        stats.bytes_written += size
+                    else:
+                        stats.bytes_written += size - old_size
+
+    return wrapper
+
+
+def instrument(cls, names: list[str], wrap) -> None:
+    """Wrap the methods of a class that it defines itself."""
+    import inspect
+
+    for name in names:
+        attribute = inspect.getattr_static(cls, name, None)
+        if attribute is None or name not in vars(cls):
+            continue
+
+        if isinstance(attribute, staticmethod):
+            function = attribute.__func__
+            setattr(cls, name, staticmethod(wrap(function.__qualname__, function)))
+        elif inspect.isfunction(attribute) and not inspect.isgeneratorfunction(attribute):
+            setattr(cls, name, wrap(attribute.__qualname__, attribute))
+
+
+def install(grocery_list_class, storage_classes) -> None:
+    """
+    Time the GroceryList operations and storage calls, and save the
+    counters at exit. Called on import of mk_core when enabled.
+    """
+    import atexit
+
+    instrument(grocery_list_class, GROCERY_LIST_OPERATIONS, timed)
+    for storage_class in storage_classes:
+        for name, access in STORAGE_ACCESS.items():
+            instrument(
+                storage_class, [name], functools.partial(storage_timed, access=access)
+            )
+
+    atexit.register(save_stats)
+
+
+# Saving and reporting======================
+
+
+def get_perf_path() -> str:
+    """Get the perf file, MKL_PERF when it names one."""
+    value = os.environ.get(constants.PERF_ENV, "")
+    if value.lower() in ("", "0", "1", "true", "yes", "on"):
+        return os.path.join(
+            constants.EXPORT_PATH, f"{constants.GROCERY_LIST}.{constants.PERF_EXTENSION}"
+        )
+    return value
+
+
+def load_stats(path: str) -> dict[str, OperationStats]:
+    try:
+        with open(path) as file:
+            records = json.load(file)
+    except FileNotFoundError:
+        return {}
+
+    return {name: OperationStats.from_dict(record) for name, record in records.items()}
+
+
+def save_stats(path: str | None = None) -> None:
+    """Add the counters of this process to the perf file."""
+    from mkl.locking import StorageLock
+
+    if not STATS:
+        return
+
+    path = path or get_perf_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Other processes may save theirs at the same time
+    with StorageLock(path).hold(exclusive=True):
+        totals = load_stats(path)
+        for name, stats in STATS.items():
+            totals.setdefault(name, OperationStats()).merge(stats)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({name: stats.to_dict() for name, stats in totals.items()}, file)
+        os.replace(temp_path, path)
+
+    STATS.clear()
+
+
+def format_bytes(count: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if count < 1024:
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+def format_report(stats: dict[str, OperationStats]) -> str:
+    """
+    Format counters as a table, the slowest operations in total first.
+
+    Args:
+        stats (dict[str, OperationStats]): The counters, by operation.
+
+    Returns:
+        str: The report.
+    """
+    lines = [
+        f"{'operation':<32} {'calls':>8} {'total ms':>10} {'mean ms':>9} "
+        f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'read':>10} {'written':>10}"
+    ]
+
+    for name, operation in sorted(stats.items(), key=lambda pair: pair[1].total, reverse=True):
+        read = format_bytes(operation.bytes_read) if operation.bytes_read else "-"
+        written = format_bytes(operation.bytes_written) if operation.bytes_written else "-"
+        lines.append(
+            f"{name:<32} {operation.calls:>8} {operation.total * 1000:>10.1f} "
+            f"{operation.total * 1000 / operation.calls:>9.3f} "
+            f"{operation.percentile(50) * 1000:>8.3f} "
+            f"{operation.percentile(90) * 1000:>8.3f} "
+            f"{operation.percentile(99) * 1000:>8.3f} {read:>10} {written:>10}"
+        )
+
+    return "\n".join(lines)
@@ -0,0 +1,255 @@
+"""
+sqlite_storage.py
+SQLite storage backend for GroceryList.
+
+Items live in one indexed table, so searches, the buy filter and sorting
+run in SQL and only the matching rows are turned into records. Changes are
+applied as single row statements inside one transaction per write.
+"""
+import os
+import sqlite3
+
+SORT_COLUMNS = ["name", "store", "cost", "amount", "priority", "buy", "id"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    store TEXT NOT NULL,
+    cost REAL NOT NULL,
+    amount INTEGER NOT NULL,
+    priority INTEGER NOT NULL,
+    buy INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_position ON items (position);
+CREATE INDEX IF NOT EXISTS items_name_key ON items (name_key);
+CREATE INDEX IF NOT EXISTS items_store ON items (store);
+CREATE INDEX IF NOT EXISTS items_buy ON items (buy, position);
+CREATE INDEX IF NOT EXISTS items_priority ON items (priority);
+"""
+
+COLUMNS = "id, name, store, cost, amount, priority, buy"
+
+# Upper bound for a prefix range scan on name_key
+PREFIX_END = chr(0x10FFFF)
+
+
+def get_name_key(name: str) -> str:
+    """Get the case-folded key used to search item names."""
+    return name.casefold()
+
+
+def record_to_row(record: dict) -> tuple:
+    return (
+        str(record["_id"]),
+        record["_name"],
+        get_name_key(record["_name"]),
+        record["_store"],
+        record["_cost"],
+        record["_amount"],
+        record["_priority"],
+        int(record["_buy"]),
+    )
+
+
+def row_to_record(row: tuple) -> dict:
+    item_id, name, store, cost, amount, priority, buy = row
+    return {
+        "_name": name,
+        "_store": store,
+        "_cost": cost,
+        "_amount": amount,
+        "_priority": priority,
+        "_buy": bool(buy),
+        "_id": int(item_id),
+    }
+
+
+class SqliteStorage:
+    """Stores the grocery list in an indexed SQLite database."""
+
+    extension = "db"
+    queryable = True
+    snapshot = False
+    trusted = False
+
+    def __init__(self, base_path: str):
+        self.path = f"{base_path}.{self.extension}"
+        self._connection = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # Writers may save from a worker thread, never at the same time
+            # as another call
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def reset(self) -> None:
+        """SQLite sees the other writers itself, nothing to forget."""
+
+    def load(self) -> list[dict]:
+        return list(self.iter_records())
+
+    def save(self, records: list[dict]) -> None:
+        """
+        Replace every row with a full snapshot of the grocery list.
+
+        Args:
+            records (list[dict]): Every item record in list order.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM items")
+            self.connection.executemany(
+                "INSERT INTO items (position, id, name, name_key, store, cost, "
+                "amount, priority, buy) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (position, *record_to_row(record))
+                    for position, record in enumerate(records)
+                ),
+            )
+
+    def write_changes(self, changes: list[dict], get_records) -> None:
+        """
+        Apply change records as row updates in one transaction.
+
+        Args:
+            changes (list[dict]): The change records, oldest first.
+            get_records (callable): Unused, rows are updated in place.
+        """
+        with self.connection:
+            for change in changes:
+                self.apply_change(change)
+
+    def apply_change(self, change: dict) -> None:
+        op = change["op"]
+
+        if op == "add":
+            self.connection.execute(
+                "INSERT OR REPLACE INTO items (position, id, name, name_key, "
+                "store, cost, amount, priority, buy) VALUES ("
+                "(SELECT COALESCE(MAX(position), -1) + 1 FROM items), "
+                "?, ?, ?, ?, ?, ?, ?, ?)",
+                record_to_row(change["item"]),
+            )
+
+        elif op == "edit":
+            self.connection.execute(
+                "UPDATE items SET id = ?, name = ?, name_key = ?, store = ?, "
+                "cost = ?, amount = ?, priority = ?, buy = ? WHERE id = ?",
+                (*record_to_row(change["item"]), str(change["id"])),
+            )
+
+        elif op == "remove":
+            self.connection.execute(
+                "DELETE FROM items WHERE id = ?", (str(change["id"]),)
+            )
+
+        elif op == "sort":
+            order_by = self.get_order_by(change["attribute"], change["reverse"])
+            self.connection.execute(
+                "UPDATE items SET position = ranked.rank FROM ("
+                f"SELECT id, ROW_NUMBER() OVER (ORDER BY {order_by}) AS rank "
+                "FROM items) AS ranked WHERE items.id = ranked.id"
+            )
+
+        else:
+            raise ValueError(f"Unknown change operation: {op}")
+
+    @staticmethod
+    def get_order_by(attribute: str, reverse: bool = False) -> str:
+        """
+        Build an ORDER BY clause that matches a stable Python sort.
+
+        Args:
+            attribute (str): The item attribute to sort by.
+            reverse (bool): Sort in descending order.
+
+        Returns:
+            str: The ORDER BY expression.
+        """
+        if attribute not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {attribute}")
+
+        if attribute == "id":
+            # Ids are stored as text, sort them as numbers
+            attribute = "CAST(id AS REAL)"
+
+        direction = "DESC" if reverse else "ASC"
+        return f"{attribute} {direction}, position ASC"
+
+    # Queries=================================
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def get_record(self, item_id: int) -> dict:
+        """
+        Get one item record by id.
+
+        Raises:
+            KeyError: If there is no item with the id.
+        """
+        row = self.connection.execute(
+            f"SELECT {COLUMNS} FROM items WHERE id = ?", (str(item_id),)
+        ).fetchone()
+
+        if row is None:
+            raise KeyError(item_id)
+        return row_to_record(row)
+
+    def iter_records(
+        self,
+        prefix: str | None = None,
+        buy: bool | None = None,
+        order_by: str | None = None,
+        reverse: bool = False,
+    ):
+        """
+        Stream item records matching the filters.
+
+        Args:
+            prefix (str | None): Only names starting with this, ignoring case.
+            buy (bool | None): Only items with this buy flag.
+            order_by (str | None): Attribute to sort by, list order if None.
+            reverse (bool): Sort in descending order.
+
+        Yields:
+            dict: The matching item records.
+        """
+        where = []
+        params = []
+
+        if prefix:
+            name_key = get_name_key(prefix)
+            where.append("name_key >= ? AND name_key < ?")
+            params.extend([name_key, name_key + PREFIX_END])
+
+        if buy is not None:
+            where.append("buy = ?")
+            params.append(int(buy))
+
+        query = f"SELECT {COLUMNS} FROM items"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+
+        if order_by:
+            query += " ORDER BY " + self.get_order_by(order_by, reverse)
+        else:
+            query += " ORDER BY position"
+
+        for row in self.connection.execute(query, params):
+            yield row_to_record(row)
@@ -0,0 +1,101 @@
+"""
+startup.py
+Checks how long the mkl command takes to import its modules.
+
+profile_startup() runs an mkl command again in a new interpreter with
+`-X importtime`, prints the slowest imports and fails when the total is
+over constants.STARTUP_BUDGET_MS, or when a CLI command loaded PyQt5.
+"""
+import subprocess
+import sys
+
+import mkl.constants as constants
+
+# Modules only the UI may import
+UI_MODULES = ("PyQt5", "mkl.ui")
+
+
+def parse_importtime(output: str) -> list[tuple[int, int, str]]:
+    """
+    Parse the report written to stderr by `python -X importtime`.
+
+    Args:
+        output (str): The stderr of the profiled process.
+
+    Returns:
+        list[tuple[int, int, str]]: The self and cumulative time in
+            microseconds and the module, nested modules keep their indent.
+    """
+    imports = []
+
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            # The header line
+            continue
+
+        imports.append((int(self_us), int(cumulative_us), module.rstrip()[1:]))
+
+    return imports
+
+
+def profile_startup(argv: list[str], ui: bool = False, top: int = 10) -> int:
+    """
+    Run an mkl command with -X importtime and report its import time.
+
+    Args:
+        argv (list[str]): The mkl arguments, without --startup-profile.
+        ui (bool): The command starts the UI, so Qt is allowed.
+        top (int): How many of the slowest imports to print.
+
+    Returns:
+        int: The exit status, 0 if the command is within the budget.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "mkl.mk_launch", *argv],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    imports = parse_importtime(process.stderr)
+
+    # Anything else on stderr came from the command itself
+    errors = [
+        line for line in process.stderr.splitlines()
+        if not line.startswith("import time:")
+    ]
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+
+    # Top level imports include everything they import in turn
+    total_us = sum(
+        cumulative_us for _, cumulative_us, module in imports
+        if not module.startswith(" ")
+    )
+
+    print(f"\nSlowest imports of 'mkl {' '.join(argv)}':")
+    for self_us, cumulative_us, module in sorted(imports, reverse=True)[:top]:
+        print(
+            f"{self_us / 1000:>8.1f} ms self {cumulative_us / 1000:>8.1f} ms "
+            f"total  {module.strip()}"
+        )
+
+    budget_ms = constants.STARTUP_BUDGET_MS
+    print(f"Import time: {total_us / 1000:.1f} ms, budget {budget_ms} ms")
+
+    status = process.returncode
+    if total_us / 1000 > budget_ms:
+        print("Import time is over budget")
+        status = status or 1
+
+    ui_modules = sorted({
+        module.strip() for _, _, module in imports
+        if module.strip().startswith(UI_MODULES)
+    })
+    if ui_modules and not ui:
+        print(f"CLI command imported UI modules: {', '.join(ui_modules)}")
+        status = status or 1
+
+    return status
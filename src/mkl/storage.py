@@ -0,0 +1,289 @@
+"""
+storage.py
+Storage backends used by GroceryList to persist the grocery list.
+
+Every backend reads and writes item records, the dictionaries returned by
+GroceryItem.to_dict(). Mutations are described by small change records:
+
+-{"op": "add", "item": {...}}
+-{"op": "edit", "id": <id before the edit>, "item": {...}}
+-{"op": "remove", "id": <id>}
+-{"op": "sort", "attribute": <attribute>, "reverse": <bool>}
+
+Backends are:
+-JsonStorage: the original format, the whole list rewritten on every change.
+-JournalStorage: a JSON snapshot plus an append-only journal of changes,
+ in files of its own.
+-SqliteStorage: an indexed SQLite table, see mkl.sqlite_storage.
+-LazyStorage: memory-mapped JSONL decoded on demand, see mkl.lazy_storage.
+-BinaryStorage: a versioned, checksummed binary snapshot, see
+ mkl.binary_storage.
+
+Every backend has reset(), called when another process wrote the files,
+see mkl.locking.
+
+Snapshot backends rewrite the whole list with every write, so callers
+making many writes should group them, see importer.import_items().
+
+Trusted backends verify their own data on load and also have load_rows(),
+which returns the item values as tuples in GroceryItem RECORD_KEYS order,
+and save_columns(), which saves them a column at a time.
+"""
+import json
+import os
+
+import mkl.constants as constants
+import mkl.utils as utils
+from mkl.binary_storage import BinaryStorage
+from mkl.lazy_storage import LazyStorage
+from mkl.sqlite_storage import SqliteStorage
+
+
+def replay_changes(records: list[dict], changes: list[dict]) -> list[dict]:
+    """
+    Apply change records on top of a list of item records.
+
+    Replaying is idempotent, so applying the same change twice leaves the
+    records as if it had been applied once. An edit of an item that is not
+    in the records is skipped, it was removed since.
+
+    Args:
+        records (list[dict]): The item records to start from.
+        changes (list[dict]): The change records to apply, oldest first.
+
+    Returns:
+        list[dict]: The item records after all changes were applied.
+    """
+    records_by_id = {record["_id"]: record for record in records}
+
+    for change in changes:
+        op = change["op"]
+
+        if op == "add":
+            item = change["item"]
+            records_by_id[item["_id"]] = item
+
+        elif op == "edit":
+            item = change["item"]
+            old_id = change["id"]
+
+            if old_id in records_by_id and old_id != item["_id"]:
+                # The id itself was edited, keep the item in its position
+                records_by_id = {
+                    (item["_id"] if key == old_id else key): (
+                        item if key == old_id else value
+                    )
+                    for key, value in records_by_id.items()
+                }
+            elif old_id in records_by_id or item["_id"] in records_by_id:
+                records_by_id[item["_id"]] = item
+            # Otherwise the item was removed, for example by another
+            # process, and the edit is dropped instead of adding it back
+
+        elif op == "remove":
+            records_by_id.pop(change["id"], None)
+
+        elif op == "sort":
+            key = f"_{change['attribute']}"
+            sorted_records = sorted(
+                records_by_id.values(),
+                key=lambda record: record[key],
+                reverse=change["reverse"],
+            )
+            records_by_id = {record["_id"]: record for record in sorted_records}
+
+        else:
+            raise ValueError(f"Unknown change operation: {op}")
+
+    return list(records_by_id.values())
+
+
+class JsonStorage:
+    """Stores the whole grocery list as one JSON file."""
+
+    extension = "json"
+    queryable = False
+    snapshot = True
+    trusted = False
+
+    def __init__(self, base_path: str):
+        self.path = f"{base_path}.{self.extension}"
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def reset(self) -> None:
+        """Forget anything cached about the files, another process wrote them."""
+
+    def load(self) -> list[dict]:
+        return utils.load_data(self.path)
+
+    def save(self, records: list[dict]) -> None:
+        """
+        Write a full snapshot of the grocery list.
+
+        Args:
+            records (list[dict]): Every item record in list order.
+        """
+        utils.save_data(self.path, records)
+
+    def write_changes(self, changes: list[dict], get_records) -> None:
+        """
+        Persist a group of changes that were already applied in memory.
+
+        Args:
+            changes (list[dict]): The change records, oldest first.
+            get_records (callable): Returns every item record in list order.
+        """
+        self.save(get_records())
+
+
+class JournalStorage(JsonStorage):
+    """
+    Stores a JSON snapshot plus a journal of change records.
+
+    Each change is appended to the journal as one JSON line, so a mutation
+    costs O(1) I/O. The journal is replayed on top of the snapshot on load
+    and folded into a new snapshot once it grows past the thresholds in
+    constants.
+
+    The snapshot is not the file of JsonStorage, which never reads or
+    clears the journal, so a journal left from an earlier run is never
+    replayed over a newer JSON save.
+    """
+
+    extension = f"{constants.JOURNAL_EXTENSION}.json"
+    snapshot = False
+
+    def __init__(self, base_path: str):
+        super().__init__(base_path)
+        self.journal_path = f"{base_path}.{constants.JOURNAL_EXTENSION}"
+        self.journal_records = 0
+        self.journal_bytes = 0
+        self.snapshot_count = 0
+
+    def exists(self) -> bool:
+        return super().exists() or os.path.exists(self.journal_path)
+
+    def load(self) -> list[dict]:
+        records = super().load()
+        self.snapshot_count = len(records)
+
+        changes = self.read_journal()
+        self.journal_records = len(changes)
+
+        return replay_changes(records, changes)
+
+    def read_journal(self) -> list[dict]:
+        changes = []
+        self.journal_bytes = 0
+
+        try:
+            with open(self.journal_path, "r") as file:
+                for line in file:
+                    try:
+                        changes.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn last line from an interrupted write
+                        break
+                    self.journal_bytes += len(line)
+
+        except FileNotFoundError:
+            pass
+
+        return changes
+
+    def save(self, records: list[dict]) -> None:
+        """
+        Write a new snapshot and clear the journal.
+
+        The snapshot is swapped in atomically before the journal is
+        truncated, so a crash in between only replays changes that are
+        already in the snapshot.
+        """
+        temp_path = f"{self.path}.tmp"
+        utils.save_data(temp_path, records)
+        os.replace(temp_path, self.path)
+
+        with open(self.journal_path, "w"):
+            pass
+
+        self.snapshot_count = len(records)
+        self.journal_records = 0
+        self.journal_bytes = 0
+
+    def write_changes(self, changes: list[dict], get_records) -> None:
+        if not changes:
+            return
+
+        lines = "".join(
+            json.dumps(change, separators=(",", ":")) + "\n" for change in changes
+        )
+        with open(self.journal_path, "a") as file:
+            file.write(lines)
+
+        self.journal_records += len(changes)
+        self.journal_bytes += len(lines)
+
+        if self.needs_compaction():
+            self.save(get_records())
+
+    def needs_compaction(self) -> bool:
+        if self.journal_bytes >= constants.JOURNAL_MAX_BYTES:
+            return True
+
+        if self.journal_records < constants.JOURNAL_MIN_RECORDS:
+            return False
+
+        ratio = self.journal_records / max(self.snapshot_count, 1)
+        return ratio >= constants.JOURNAL_MAX_RATIO
+
+
+STORAGE_CLASSES = {
+    "json": JsonStorage,
+    "journal": JournalStorage,
+    "sqlite": SqliteStorage,
+    "lazy": LazyStorage,
+    "binary": BinaryStorage,
+}
+
+
+def get_storage(storage_format: str, base_path: str):
+    """
+    Create the storage backend for a format.
+
+    Args:
+        storage_format (str): One of constants.STORAGE_FORMATS.
+        base_path (str): The data file path without its extension.
+
+    Returns:
+        JsonStorage: The storage backend.
+    """
+    if storage_format not in STORAGE_CLASSES:
+        raise ValueError(f"Unknown storage format: {storage_format}")
+
+    return STORAGE_CLASSES[storage_format](base_path)
+
+
+def convert_storage(source_format: str, target_format: str, base_path: str) -> int:
+    """
+    Copy the grocery list from one storage format to another.
+
+    Args:
+        source_format (str): The format to read from.
+        target_format (str): The format to write to.
+        base_path (str): The data file path without its extension.
+
+    Returns:
+        int: The number of items copied.
+    """
+    if source_format == target_format:
+        raise ValueError("Source and target storage formats are the same")
+
+    source = get_storage(source_format, base_path)
+    target = get_storage(target_format, base_path)
+
+    records = source.load() if source.exists() else []
+    target.save(records)
+
+    return len(records)
@@ -0,0 +1,302 @@
+"""
+item_model.py
+Table model that shows GroceryItems in a QTableView.
+
+The model holds the items to show, in the order to show them, and only
+hands rows to the view a page at a time through canFetchMore()/fetchMore(),
+as the user scrolls. No widget is made per cell, the view asks data() for
+the visible cells only.
+
+Changes are reported to the view with targeted signals: append_item(),
+insert_item() and remove_row() insert and remove one row, move_row() moves
+one, update_row() repaints one row, and only set_items() resets the whole
+table.
+
+The model listens to its GroceryList, see GroceryList.add_listener(), and
+finds the row of an edited or removed item through an id to row map, so
+an edit repaints one row and a delete removes one row wherever the change
+was made from.
+"""
+from PyQt5 import QtCore
+
+from mkl import utils
+
+# Rows handed to the view by each fetchMore()
+PAGE_SIZE = 200
+
+COLUMNS = ["name", "store", "cost", "amount", "priority", "buy"]
+HEADERS = ["Name", "Store", "Cost ($)", "Amount", "Priority", "Buy"]
+BUY_COLUMN = COLUMNS.index("buy")
+# Converts the text typed into a cell, the GroceryItem setters check the rest
+COLUMN_TYPES = {"name": str, "store": str, "cost": float, "amount": int, "priority": int}
+
+
+class ItemTableModel(QtCore.QAbstractTableModel):
+    """
+    The rows of a QTableView, one per GroceryItem.
+
+    Args:
+        grocery_app (GroceryList): The list the items belong to, cell edits
+            are saved through it.
+    """
+
+    def __init__(self, grocery_app, parent=None):
+        super().__init__(parent)
+        self.grocery_app = grocery_app
+        # Every item to show, in order
+        self.items = []
+        # Rows the view has been given, the first `fetched` items
+        self.fetched = 0
+        # Row of each item by id, only right for rows below `mapped`, the
+        # rest is mapped again on next lookup
+        self.rows_by_id = {}
+        self.mapped = 0
+
+        self.grocery_app.add_listener(self.on_list_changed)
+
+    # Rows====================================
+
+    def set_items(self, items) -> None:
+        """Show new items, replacing every row."""
+        self.beginResetModel()
+        self.items = list(items)
+        self.fetched = min(PAGE_SIZE, len(self.items))
+        self.rows_by_id = {}
+        self.mapped = 0
+        self.endResetModel()
+
+    def item_at(self, row: int):
+        return self.items[row]
+
+    def get_row(self, id: int) -> int | None:
+        """
+        Get the row of an item.
+
+        Rows moved by an insert or a delete are mapped again here, from the
+        first moved row on, so changes near the end of a long table stay
+        cheap.
+
+        Args:
+            id (int): The item id.
+
+        Returns:
+            int | None: The row, None if the item is not shown.
+        """
+        row = self.rows_by_id.get(id)
+        if row is not None and row < self.mapped:
+            return row
+
+        items = self.items
+        for row in range(self.mapped, len(items)):
+            self.rows_by_id[items[row].id] = row
+        self.mapped = len(items)
+
+        return self.rows_by_id.get(id)
+
+    def find_sorted_row(self, item, attribute: str, reverse: bool = False) -> int:
+        """
+        Find where an item goes in rows sorted like GroceryList.iter_sorted().
+
+        Args:
+            item (GroceryItem): The item to place.
+            attribute (str): The attribute the rows are sorted by.
+            reverse (bool): The rows are largest value first.
+
+        Returns:
+            int: The row to insert the item at.
+        """
+        key = (getattr(item, attribute), item.id)
+        low, high = 0, len(self.items)
+
+        while low < high:
+            middle = (low + high) // 2
+            other = self.items[middle]
+            other_key = (getattr(other, attribute), other.id)
+            if (other_key > key) if reverse else (other_key < key):
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def append_item(self, item) -> None:
+        """Show an item after the last row."""
+        self.insert_item(len(self.items), item)
+
+    def insert_item(self, row: int, item) -> None:
+        """Show an item at a row, moving the rows below it down."""
+        self.mapped = min(self.mapped, row)
+
+        if row > self.fetched:
+            # Not fetched yet, the view gets it when it scrolls there
+            self.items.insert(row, item)
+            return
+
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self.items.insert(row, item)
+        self.fetched += 1
+        self.endInsertRows()
+
+    def remove_row(self, row: int) -> None:
+        self.rows_by_id.pop(self.items[row].id, None)
+        self.mapped = min(self.mapped, row)
+
+        if row >= self.fetched:
+            del self.items[row]
+            return
+
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        del self.items[row]
+        self.fetched -= 1
+        self.endRemoveRows()
+
+    def move_row(self, row: int, to_row: int) -> None:
+        """Move one row, to_row is its row once moved."""
+        self.mapped = min(self.mapped, row, to_row)
+
+        if row >= self.fetched or to_row >= self.fetched:
+            # One end is not fetched yet, the view only sees one side
+            item = self.items[row]
+            self.remove_row(row)
+            self.insert_item(to_row, item)
+            return
+
+        # Qt counts the destination before the row is taken out
+        destination = to_row + 1 if to_row > row else to_row
+        self.beginMoveRows(QtCore.QModelIndex(), row, row, QtCore.QModelIndex(), destination)
+        self.items.insert(to_row, self.items.pop(row))
+        self.endMoveRows()
+
+    def move_sorted_item(self, item, attribute: str, reverse: bool = False) -> None:
+        """
+        Move an edited item to where it now sorts, in rows sorted like
+        GroceryList.iter_sorted().
+
+        Args:
+            item (GroceryItem): The edited item.
+            attribute (str): The attribute the rows are sorted by.
+            reverse (bool): The rows are largest value first.
+        """
+        row = self.get_row(item.id)
+        if row is None:
+            return
+
+        # Placed among the other rows, then put back until it is moved
+        self.items.pop(row)
+        to_row = self.find_sorted_row(item, attribute, reverse)
+        self.items.insert(row, item)
+
+        if to_row != row:
+            self.move_row(row, to_row)
+
+    def update_row(self, row: int) -> None:
+        """Repaint one row after its item changed."""
+        if row < self.fetched:
+            self.dataChanged.emit(
+                self.index(row, 0), self.index(row, len(COLUMNS) - 1)
+            )
+
+    def on_list_changed(self, op: str, item, id: int | None) -> None:
+        """
+        Update the row of an edited or removed item, called by the
+        GroceryList. Adds and resets are left to the view, which knows
+        whether new items belong in the rows shown.
+        """
+        if op not in ("edit", "remove"):
+            return
+
+        row = self.get_row(id)
+        if row is None:
+            return
+
+        if op == "remove":
+            self.remove_row(row)
+            return
+
+        if item.id != id:
+            self.rows_by_id.pop(id, None)
+            self.rows_by_id[item.id] = row
+        self.update_row(row)
+
+    # QAbstractTableModel=====================
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.fetched
+
+    def columnCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()) -> bool:
+        return not parent.isValid() and self.fetched < len(self.items)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()) -> None:
+        if parent.isValid():
+            return
+
+        count = min(PAGE_SIZE, len(self.items) - self.fetched)
+        if count <= 0:
+            return
+
+        self.beginInsertRows(QtCore.QModelIndex(), self.fetched, self.fetched + count - 1)
+        self.fetched += count
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        item = self.items[index.row()]
+        column = index.column()
+
+        if role == QtCore.Qt.UserRole:
+            return item.id
+
+        if column == BUY_COLUMN:
+            if role == QtCore.Qt.CheckStateRole:
+                return QtCore.Qt.Checked if item.buy else QtCore.Qt.Unchecked
+            return None
+
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return str(getattr(item, COLUMNS[column]))
+
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.NoItemFlags
+
+        flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        if index.column() == BUY_COLUMN:
+            return flags | QtCore.Qt.ItemIsUserCheckable
+        return flags | QtCore.Qt.ItemIsEditable
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole) -> bool:
+        """Save a cell edit, the list tells the model which row to repaint."""
+        if not index.isValid():
+            return False
+
+        item = self.items[index.row()]
+        column = COLUMNS[index.column()]
+
+        if column == "buy":
+            if role != QtCore.Qt.CheckStateRole:
+                return False
+        elif role != QtCore.Qt.EditRole:
+            return False
+
+        try:
+            if column == "buy":
+                fields = {"buy": QtCore.Qt.CheckState(value) == QtCore.Qt.Checked}
+            else:
+                fields = {column: COLUMN_TYPES[column](value)}
+            self.grocery_app.edit_items({item.id: fields})
+        except (ValueError, TypeError) as error:
+            utils.show_warning(msg=str(error))
+            return False
+
+        return True
@@ -2,13 +2,33 @@ from PyQt5 import QtWidgets, QtCore, QtGui
 from mkl import constants
 from mkl import mk_core
 from mkl import utils
+from mkl.ui.item_model import ItemTableModel
+from mkl.ui.persister import WriteBehindSaver
+from mkl.ui.search_worker import SearchTask
 
 class GroceryApp(QtWidgets.QWidget):
-    def __init__(self):
+    def __init__(self, grocery_app=None):
         super().__init__()
-        self.grocery_app = mk_core.GroceryList()
-
-        self.mode ="loading"
+        # The list of the launcher, in the storage format it was given
+        if grocery_app is None:
+            grocery_app = mk_core.GroceryList()
+        self.grocery_app = grocery_app
+        # Changes are saved on a worker thread, shortly after they are made
+        self.saver = WriteBehindSaver(self.grocery_app, self)
+
+        # Attribute and reverse flag the table is shown sorted by, None
+        # for list order
+        self.sort_order = None
+
+        # Numbers of the newest search and of the list changes seen, older
+        # search results are dropped
+        self.search_generation = 0
+        self.list_version = 0
+        # Searches started and not finished yet
+        self.search_tasks = set()
+        # Indexes built by searches and the items of their ids, by index
+        # name, only searched by workers and dropped once the list changes
+        self.search_indexes = {}
         
         self.setWindowTitle("Mk Grocery List")
         self.setGeometry(100, 100, 600, 900)
@@ -45,6 +65,8 @@ class GroceryApp(QtWidgets.QWidget):
         self.delete_button.clicked.connect(self.delete_item)
         self.sort_button = QtWidgets.QPushButton("Sort")
         self.sort_button.clicked.connect(self.sort_items)
+        self.save_order_button = QtWidgets.QPushButton("Save Order")
+        self.save_order_button.clicked.connect(self.save_order)
         self.export_button = QtWidgets.QPushButton("Export Selected Items")
         self.export_button.clicked.connect(self.export_selected_items)
 
@@ -63,27 +85,54 @@ class GroceryApp(QtWidgets.QWidget):
 
         # Search field
         self.search_input = QtWidgets.QLineEdit(self, placeholderText="Search by Name")
-        self.search_input.textChanged.connect(self.search_items)
-
-        # Table Widget
-        self.items_table = QtWidgets.QTableWidget()
-        self.items_table.setColumnCount(6)
-        self.items_table.setHorizontalHeaderLabels(
-            ["Name", "Store", "Cost ($)", "Amount", "Priority", "Buy"]
-        )
-        self.items_table.setSelectionBehavior(QtWidgets.QTableWidget.SelectRows)
+        self.search_input.textChanged.connect(self.schedule_search)
+        self.fuzzy_checkbox = QtWidgets.QCheckBox("Fuzzy")
+        self.fuzzy_checkbox.toggled.connect(self.search_items)
+        # Restarted by every keystroke, the search runs once typing pauses
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(constants.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.search_items)
+        # One search at a time, off the GUI thread
+        self.search_pool = QtCore.QThreadPool(self)
+        self.search_pool.setMaxThreadCount(1)
+        self.search_layout = QtWidgets.QHBoxLayout()
+        self.search_layout.addWidget(self.search_input)
+        self.search_layout.addWidget(self.fuzzy_checkbox)
+
+        # Table View, rows are made by the model as they are scrolled to
+        self.items_model = ItemTableModel(self.grocery_app, self)
+        # After the model's own listener, which updates edited and removed rows
+        self.grocery_app.add_listener(self.on_list_changed)
+        self.items_table = QtWidgets.QTableView()
+        self.items_table.setModel(self.items_model)
+        self.items_table.setSelectionBehavior(QtWidgets.QTableView.SelectRows)
+        self.items_table.setSelectionMode(QtWidgets.QTableView.SingleSelection)
         self.items_table.horizontalHeader().setSectionResizeMode(
             QtWidgets.QHeaderView.Stretch
         )
+        # Fixed row heights, so rows are never measured
+        self.items_table.verticalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.Fixed
+        )
         self.items_table.setShowGrid(False)
-        self.items_table.itemSelectionChanged.connect(self.item_selected)
-        self.items_table.itemChanged.connect(self.on_items_changed)
+        self.items_table.selectionModel().selectionChanged.connect(self.item_selected)
+
+        # Footer with the running totals and whether everything is saved
+        self.totals_label = QtWidgets.QLabel()
+        self.save_status_label = QtWidgets.QLabel(self.saver.status)
+        self.saver.status_changed.connect(self.save_status_label.setText)
+        self.footer_layout = QtWidgets.QHBoxLayout()
+        self.footer_layout.addWidget(self.totals_label)
+        self.footer_layout.addStretch()
+        self.footer_layout.addWidget(self.save_status_label)
 
         # Sort Layout
         self.sort_layout.addWidget(self.sort_combo_box)
         self.sort_layout.addWidget(self.ascending_radio)
         self.sort_layout.addWidget(self.descending_radio)
         self.sort_layout.addWidget(self.sort_button)
+        self.sort_layout.addWidget(self.save_order_button)
 
         # Main Layout
         self.main_layout.addWidget(self.name_input)
@@ -94,9 +143,10 @@ class GroceryApp(QtWidgets.QWidget):
         self.main_layout.addWidget(self.add_button)
         self.main_layout.addWidget(self.delete_button)
         self.main_layout.addLayout(self.sort_layout)
-        self.main_layout.addWidget(self.search_input)
+        self.main_layout.addLayout(self.search_layout)
         self.main_layout.addWidget(self.items_table)
         self.main_layout.addWidget(self.export_button)
+        self.main_layout.addLayout(self.footer_layout)
         self.setLayout(self.main_layout)
 
         self.reload_ui()
@@ -104,6 +154,16 @@ class GroceryApp(QtWidgets.QWidget):
     def run(self):
         self.show()
 
+    def closeEvent(self, event):
+        # Save what is left before the window goes, stay open if it fails
+        try:
+            self.saver.flush()
+        except Exception as error:
+            utils.show_warning(msg=f"Saving failed, the list stays open: {error}")
+            event.ignore()
+            return
+        event.accept()
+
     def add_item(self):
         name = constants.NAME_DEFAULT
         store = constants.STORE_DEFAULT
@@ -129,18 +189,45 @@ class GroceryApp(QtWidgets.QWidget):
 
         self.grocery_app.add_item(name, store, cost, amount, priority, buy)
         utils.show_warning(title="SUCCESS", msg=f"{name} was added")
-    
-        self.reload_ui()
+
+        self.clear_inputs()
 
     def delete_item(self, name):
-        selected_items = self.items_table.selectedItems()
-        if selected_items:
-            row = self.items_table.currentRow()
-            name = str(self.items_table.item(row, 0).text())
-            id = self.items_table.item(row, 0).data(QtCore.Qt.UserRole)
-            self.items_table.removeRow(row)
-            self.grocery_app.remove_item(name, id)   
-            utils.show_warning(title="SUCCESS", msg=f"{name} was removed")
+        row = self.get_selected_row()
+        if row is not None:
+            item = self.items_model.item_at(row)
+            self.grocery_app.remove_item(item.name, item.id)
+
+    def on_list_changed(self, op, item, id):
+        # Called by the list after every change, only touches the rows changed
+        self.list_version += 1
+        self.search_indexes.clear()
+
+        if op == "add":
+            if self.search_input.text():
+                # Search results are not updated until the next search
+                pass
+            elif self.sort_order:
+                row = self.items_model.find_sorted_row(item, *self.sort_order)
+                self.items_model.insert_item(row, item)
+            else:
+                self.items_model.append_item(item)
+
+        elif op == "edit":
+            # The model repainted the row, move it if its sort key changed
+            if self.sort_order and not self.search_input.text():
+                self.items_model.move_sorted_item(item, *self.sort_order)
+
+        elif op == "reset":
+            self.search_items()
+
+        self.update_totals()
+
+    def get_selected_row(self):
+        rows = self.items_table.selectionModel().selectedRows()
+        if rows:
+            return rows[0].row()
+        return None
 
     def populate_combo_box(self):
         for attr in ["name", "store", "cost", "amount", "priority"]:
@@ -148,130 +235,114 @@ class GroceryApp(QtWidgets.QWidget):
         self.sort_combo_box.setCurrentText("name")
 
     def reload_ui(self):
-        self.mode = "loading"
+        self.clear_inputs()
+        self.show_items()
 
-        # Clear Input Fields
+    def clear_inputs(self):
         self.name_input.clear()
         self.store_input.clear()
         self.cost_input.clear()
         self.amount_input.clear()
         self.priority_input.clear()
 
-        # Reload The Table
-        self.items_table.setRowCount(0)
-
-        if self.grocery_app.grocery_list:
-            for item in self.grocery_app.grocery_list:
-                row_position = self.items_table.rowCount()
-                self.items_table.insertRow(row_position)
-
-                #Add the rest of the item attributes
-                self.items_table.setItem(
-                    row_position, 0, QtWidgets.QTableWidgetItem(item.name)
-                )
-                self.items_table.setItem(
-                    row_position, 1, QtWidgets.QTableWidgetItem(item.store)
-                )
-                self.items_table.setItem(
-                    row_position, 2, QtWidgets.QTableWidgetItem(f"{item.cost}")
-                )
-                self.items_table.setItem(
-                    row_position, 3, QtWidgets.QTableWidgetItem(str(item.amount))
-                )
-                self.items_table.setItem(
-                    row_position, 4, QtWidgets.QTableWidgetItem(str(item.priority))
-                )
-
-                #Add checkbox in the first column
-                checkbox_item = QtWidgets.QTableWidgetItem()
-                checkbox_item.setFlags(
-                    QtCore.Qt.ItemIsUserCheckable | QtCore.Qt.ItemIsEnabled
-                )
-                if item.buy == True:
-                    checkbox_item.setCheckState(QtCore.Qt.Checked)
-                else:
-                    checkbox_item.setCheckState(QtCore.Qt.Unchecked)
-
-                self.items_table.setItem(row_position, 5, checkbox_item)
-
-                # Set the data for row 6, keep it hidden
-                self.items_table.item(row_position, 0).setData(
-                    QtCore.Qt.UserRole, item.id
-                )
-
-        self.mode = "user"
-                
-    def on_items_changed(self, item):
-        if self.mode == "loading":
-            return
-
-        row = item.row()
-        name = str(self.items_table.item(row, 0).text())
-        store = str(self.items_table.item(row, 1).text())
-        cost = float(self.items_table.item(row, 2).text())
-        amount = int(self.items_table.item(row, 3).text())
-        priority = int(self.items_table.item(row, 4).text())
-
-        checkbox_item = self.items_table.item(row, 5)
-
-        if checkbox_item.checkState() == QtCore.Qt.Checked:
-            buy = True
+    def show_items(self):
+        # The model copies the item order, rows are made when scrolled to
+        if self.sort_order:
+            items = self.grocery_app.iter_sorted(*self.sort_order)
         else:
-            buy = False
-
-        id = self.items_table.item(row, 0).data(QtCore.Qt.UserRole)
+            items = self.grocery_app.grocery_list
 
-        self.grocery_app.edit_item(name, store, cost, amount, priority, buy, id)
-
-        self.reload_ui()
+        self.items_model.set_items(items)
+        self.update_totals()
 
     def item_selected(self):
-        selected_items = self.items_table.selectedItems()
-        if selected_items:
-            row = self.items_table.currentRow()
-            self.name_input.setText(self.items_table.item(row, 0).text())
-            self.store_input.setText(self.items_table.item(row, 1).text())
-            self.cost_input.setText(
-                self.items_table.item(row, 2).text().replace("$", "")
-            )
-            self.amount_input.setText(self.items_table.item(row, 3).text())
-            self.priority_input.setText(self.items_table.item(row, 4).text())
-
+        row = self.get_selected_row()
+        if row is not None:
+            item = self.items_model.item_at(row)
+            self.name_input.setText(item.name)
+            self.store_input.setText(item.store)
+            self.cost_input.setText(str(item.cost))
+            self.amount_input.setText(str(item.amount))
+            self.priority_input.setText(str(item.priority))
+
+    def update_totals(self):
+        # Running totals, no scan of the list
+        totals = self.grocery_app.get_totals()
+        total_cost = self.grocery_app.get_total_cost(round_cost=True)
+        self.totals_label.setText(
+            f"Items: {totals.count} | To buy: {totals.buy_count} "
+            f"| Total with tax: ${total_cost:.2f}"
+        )
+                
     def sort_items(self):
+        # Only the table is sorted, the list and its file are unchanged
         if self.ascending_radio.isChecked():
             reverse = False
         else:
             reverse = True
-        self.grocery_app.sort_items(self.sort_combo_box.currentText(), reverse=reverse)
-        self.reload_ui()
+        self.sort_order = (self.sort_combo_box.currentText(), reverse)
+        self.show_items()
+
+    def save_order(self):
+        # Save the order the table is shown in as the list order
+        if self.sort_order:
+            attribute, reverse = self.sort_order
+            # Back to list order, the list shows itself again once sorted
+            self.sort_order = None
+            self.grocery_app.sort_items(attribute, reverse=reverse)
+            self.clear_inputs()
+
+    def schedule_search(self):
+        self.search_timer.start()
 
     def search_items(self):
+        self.search_timer.stop()
+        self.search_generation += 1
+        for task in self.search_tasks:
+            task.cancelled = True
+
         search_term = self.search_input.text().lower()
-        self.items_table.setRowCount(0)
-
-        matching_items = self.grocery_app.search_item_name(search_term)
-
-        self.mode = "loading"
-        for item in matching_items:
-            row_position = self.items_table.rowCount()
-            self.items_table.insertRow(row_position)
-
-            self.items_table.setItem(
-                row_position, 0, QtWidgets.QTableWidgetItem(item.name)
-            )
-            self.items_table.setItem(
-                row_position, 1, QtWidgets.QTableWidgetItem(item.store)
-            )
-            self.items_table.setItem(
-                row_position, 2, QtWidgets.QTableWidgetItem(f"{item.cost}")
-            )
-            self.items_table.setItem(
-                row_position, 3, QtWidgets.QTableWidgetItem(str(item.amount))
-            )
-            self.items_table.setItem(
-                row_position, 4, QtWidgets.QTableWidgetItem(str(item.priority))
-            )
-        self.mode = "user"
+
+        if not search_term:
+            self.show_items()
+            return
+
+        # Loaded here, the worker only reads a loaded list
+        self.grocery_app.grocery_list
+        fuzzy = self.fuzzy_checkbox.isChecked()
+        task = SearchTask(
+            self.grocery_app,
+            search_term,
+            fuzzy,
+            self.search_generation,
+            self.list_version,
+            self.search_indexes.get("trigram" if fuzzy else "name"),
+        )
+        task.signals.finished.connect(self.show_search_results)
+        self.search_tasks.add(task)
+        self.search_pool.start(task)
+
+    def show_search_results(self, task):
+        self.search_tasks.discard(task)
+
+        if task.generation != self.search_generation:
+            # A newer search was started
+            return
+
+        if task.version != self.list_version:
+            # The list changed while searching, the results may be wrong
+            self.search_items()
+            return
+
+        if task.error is not None:
+            utils.show_warning(msg=str(task.error))
+            return
+
+        if task.built_index:
+            self.search_indexes[task.index_name] = (task.index, task.items_by_id)
+
+        # Rows are handed to the view a page at a time
+        self.items_model.set_items(task.items)
 
     def export_selected_items(self):
         self.grocery_app.export_items()
@@ -0,0 +1,186 @@
+"""
+persister.py
+Saves the changes made in the UI on a worker thread, shortly after they
+are made.
+
+The list holds its writes, see GroceryList.hold_writes(). The first change
+after a save starts a timer, and every change made before it fires goes
+into the same write, so ten quick edits cost one write and the window
+never waits on disk.
+
+The GUI thread only hands the held change records to the worker. The
+records to save are rebuilt on the worker by replaying those changes over
+the records of the last save, so the list is only turned into records on
+the GUI thread once, before the first save.
+
+Closing the window saves whatever is left on the GUI thread, see flush().
+"""
+import logging
+
+from PyQt5 import QtCore
+
+import mkl.constants as constants
+from mkl import storage
+
+STATUS_SAVED = "All changes saved"
+STATUS_UNSAVED = "Unsaved changes"
+STATUS_SAVING = "Saving..."
+STATUS_FAILED = "Saving failed, changes are kept"
+
+
+class SaveSignals(QtCore.QObject):
+    # The SaveTask, emitted once it ran
+    finished = QtCore.pyqtSignal(object)
+
+
+class SaveTask(QtCore.QRunnable):
+    """
+    One write of held changes, run on a worker thread.
+
+    Args:
+        grocery_app (GroceryList): The list the changes were taken from.
+        changes (list[dict]): The change records, see
+            GroceryList.take_changes().
+        records (list[dict]): The item records of the last save.
+    """
+
+    def __init__(self, grocery_app, changes: list[dict], records: list[dict]):
+        super().__init__()
+        # Kept by the persister until finished, so Python owns the task
+        self.setAutoDelete(False)
+
+        self.grocery_app = grocery_app
+        self.changes = changes
+        self.records = records
+
+        # Set by run()
+        self.stale = False
+        self.error = None
+
+        self.signals = SaveSignals()
+
+    def get_records(self) -> list[dict]:
+        return self.records
+
+    def run(self) -> None:
+        try:
+            self.records = storage.replay_changes(self.records, self.changes)
+            self.stale = self.grocery_app.save_taken_changes(self.changes, self.get_records)
+        except Exception as error:
+            self.error = error
+
+        self.signals.finished.emit(self)
+
+
+class WriteBehindSaver(QtCore.QObject):
+    """
+    Saves the changes of a GroceryList in the background.
+
+    Args:
+        grocery_app (GroceryList): The list, its writes are held from now on.
+    """
+
+    # The text of the status indicator
+    status_changed = QtCore.pyqtSignal(str)
+
+    def __init__(self, grocery_app, parent=None):
+        super().__init__(parent)
+        self.grocery_app = grocery_app
+        self.grocery_app.hold_writes()
+
+        # Item records of the last save, None until the first save
+        self.records = None
+        # The save running on the worker, None when idle
+        self.task = None
+        self.status = STATUS_SAVED
+
+        # Not restarted by later changes, so a steady stream of changes is
+        # still saved every SAVE_DELAY_MS
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(constants.SAVE_DELAY_MS)
+        self.timer.timeout.connect(self.save)
+        # One save at a time, in change order
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.grocery_app.add_listener(self.on_list_changed)
+
+    def set_status(self, status: str) -> None:
+        if status != self.status:
+            self.status = status
+            self.status_changed.emit(status)
+
+    def on_list_changed(self, op, item, id) -> None:
+        if not self.timer.isActive():
+            self.timer.start()
+        if self.task is None:
+            self.set_status(STATUS_UNSAVED)
+
+    def save(self) -> None:
+        """Start saving the held changes on the worker thread."""
+        if self.task is not None:
+            # Saved once the running save finishes
+            return
+
+        changes = self.grocery_app.take_changes()
+        if not changes:
+            self.set_status(STATUS_SAVED)
+            return
+
+        if self.records is None:
+            # Already holds the changes, replaying them again changes nothing
+            self.records = self.grocery_app.get_records()
+
+        self.task = SaveTask(self.grocery_app, changes, self.records)
+        self.task.signals.finished.connect(self.on_saved)
+        self.set_status(STATUS_SAVING)
+        self.pool.start(self.task)
+
+    def on_saved(self, task: SaveTask) -> None:
+        if task is not self.task:
+            # Already handled by flush()
+            return
+        self.task = None
+
+        if task.error is not None:
+            # Kept for the next save, which the next change starts
+            self.grocery_app.unsaved_changes[:0] = task.changes
+            logging.error(f"Saving the grocery list failed: {task.error}")
+            self.set_status(STATUS_FAILED)
+            return
+
+        if task.stale:
+            # Another process wrote, storage holds its changes and ours
+            self.records = None
+            self.grocery_app.reload()
+        else:
+            self.records = task.records
+
+        if self.grocery_app.unsaved_changes:
+            if not self.timer.isActive():
+                self.timer.start()
+            self.set_status(STATUS_UNSAVED)
+        else:
+            self.set_status(STATUS_SAVED)
+
+    def flush(self) -> None:
+        """
+        Save every held change now, on this thread, after any running save.
+
+        Raises:
+            Exception: If saving fails, the changes are kept.
+        """
+        self.timer.stop()
+        self.pool.waitForDone()
+        if self.task is not None:
+            # Its finished signal is still queued
+            self.on_saved(self.task)
+
+        try:
+            self.grocery_app.flush()
+        except Exception:
+            self.set_status(STATUS_FAILED)
+            raise
+
+        self.set_status(STATUS_SAVED)
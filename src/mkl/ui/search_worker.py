@@ -0,0 +1,102 @@
+"""
+search_worker.py
+Runs the searches of the UI search box on a worker thread.
+
+The window starts a SearchTask once typing pauses, on a QThreadPool of
+its own, and gets the task back through its finished signal on the GUI
+thread. Only the newest search is shown: older tasks are cancelled before
+they start, and results of a task that was overtaken, or that ran while
+the list changed, are dropped.
+
+The list keeps changing on the GUI thread while a task runs, so a task
+never reads the list's own indexes or items. It searches an index the
+window keeps for it, built by an earlier task, or builds a new one on the
+worker from a copy of the items taken when the task was made. The window
+keeps that index for the next searches until the list changes. Nothing
+changes an index once it is built, so the worker reads it safely.
+"""
+from PyQt5 import QtCore
+
+
+class SearchSignals(QtCore.QObject):
+    # The SearchTask, emitted once it ran or was cancelled
+    finished = QtCore.pyqtSignal(object)
+
+
+class SearchTask(QtCore.QRunnable):
+    """
+    One search of the loaded list, made on the GUI thread and run on a
+    worker thread.
+
+    Args:
+        grocery_app (GroceryList): The list to search, must be loaded.
+        search_term (str): The start of the names to find, or the text to
+            match when fuzzy.
+        fuzzy (bool): Use search_item_fuzzy() instead of search_item_name().
+        generation (int): The number of the search, newer searches have
+            higher numbers.
+        version (int): The number of list changes the window had seen when
+            the search started.
+        cached (tuple | None): The index and the items of its ids, by id,
+            built by an earlier task of the same version, None to build them.
+    """
+
+    def __init__(
+        self,
+        grocery_app,
+        search_term: str,
+        fuzzy: bool,
+        generation: int,
+        version: int,
+        cached: tuple | None = None,
+    ):
+        super().__init__()
+        # Kept by the window until finished, so Python owns the task
+        self.setAutoDelete(False)
+
+        self.grocery_app = grocery_app
+        self.search_term = search_term
+        self.fuzzy = fuzzy
+        self.generation = generation
+        self.version = version
+        self.cancelled = False
+
+        self.index_name = "trigram" if fuzzy else "name"
+        self.index, self.items_by_id = cached or (None, None)
+        # Copied here, the worker must not read the list while it changes
+        self.snapshot = list(grocery_app.grocery_list) if cached is None else None
+        self.built_index = False
+
+        # Set by run()
+        self.items = None
+        self.error = None
+
+        self.signals = SearchSignals()
+
+    def run(self) -> None:
+        if not self.cancelled:
+            try:
+                if self.index is None:
+                    self.index = self.grocery_app.build_index(self.index_name, self.snapshot)
+                    self.items_by_id = {item.id: item for item in self.snapshot}
+                    self.built_index = True
+                    self.snapshot = None
+
+                if self.fuzzy:
+                    self.items = self.grocery_app.search_item_fuzzy(
+                        self.search_term,
+                        trigram_index=self.index,
+                        items_by_id=self.items_by_id,
+                    )
+                else:
+                    self.items = self.grocery_app.search_item_name(
+                        self.search_term,
+                        name_index=self.index,
+                        items_by_id=self.items_by_id,
+                    )
+            except Exception as error:
+                # An item edited while the index was built, the window
+                # decides once it knows whether the list changed
+                self.error = error
+
+        self.signals.finished.emit(self)
@@ -25,7 +25,7 @@ def load_stylesheet():
         padding: 5px;
     }
 
-    QTableWidget {
+    QTableView {
         background-color: #CBE3CA;  
         border: 1px solid #633951;
         color: #303830;
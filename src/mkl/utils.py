@@ -1,5 +1,5 @@
 import json
-from PyQt5 import QtWidgets
+import sys
 
 def save_data(file_path, data):
 
@@ -36,10 +36,18 @@ def show_warning(msg, title="WARNING"):
     """
     Show a warning box
 
+    Qt is only used when the UI already loaded it, from the CLI the message
+    is printed instead, so CLI commands never import PyQt5.
+
     Args:
         msg (string): message to be displayed
         title (string) : title for window
     """
+    QtWidgets = sys.modules.get("PyQt5.QtWidgets")
+    if QtWidgets is None or QtWidgets.QApplication.instance() is None:
+        print(f"{title}: {msg}")
+        return
+
     window = QtWidgets.QMessageBox()
     window.setWindowTitle(title)
     window.setText(msg)